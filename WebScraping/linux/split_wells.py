@@ -1,53 +1,180 @@
 #!/usr/bin/env python3
-import argparse, math
+import argparse, math, os
 from pathlib import Path
 
+
+_FADVISE = getattr(os, "posix_fadvise", None)  # absent on non-Linux
+
 def load_clean_lines(p: Path):
-    out = []
-    for raw in p.read_text(encoding="utf-8", errors="ignore").splitlines():
-        line = raw.strip()
-        if not line or line.startswith("#"):
-            continue
-        out.append(line)
-    return out
-
-def chunks_even(seq, parts):
-    n = len(seq)
+    # Clean in the bytes domain: one read, one C-level split, one filtering
+    # comprehension — no per-line decode/strip round trips through str.
+    # Both master and parts are single-pass files, so tell the kernel not to
+    # keep their pages cached away from the scraper workers.
+    fd = os.open(str(p), os.O_RDONLY)
+    try:
+        if _FADVISE:
+            _FADVISE(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        chunks = []
+        while True:
+            buf = os.read(fd, 1 << 20)
+            if not buf:
+                break
+            chunks.append(buf)
+        if _FADVISE:
+            _FADVISE(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    data = b"".join(chunks)
+    for l in map(bytes.strip, data.splitlines()):
+        if l and l[:1] != b"#":
+            yield l
+
+def chunk_sizes(n, parts):
     base = n // parts
     rem = n % parts
-    out = []
-    i = 0
     for k in range(parts):
-        sz = base + (1 if k < rem else 0)
-        out.append(seq[i:i+sz])
-        i += sz
-    return out
+        yield base + (1 if k < rem else 0)
+
+def write_part(outp: Path, view):
+    # One positioned write of a slice of the shared master buffer; no per-part
+    # join or fragment list.
+    fd = os.open(str(outp), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.pwrite(fd, view, 0)
+        if _FADVISE:
+            _FADVISE(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+def publish_shared_master(payload, bounds):
+    """Expose the cleaned master in shared memory for sibling workers.
+
+    Writes 'aer_wells' (all parts concatenated, newline-terminated) plus
+    'aer_wells_idx' (int64 byte offsets, parts+1 entries), so a worker can
+    slice buf[idx[wid]:idx[wid+1]] at startup instead of re-reading its
+    wells_NN.txt from disk.
+
+    The segments are meant to OUTLIVE this process, so each one is
+    untracked after creation — otherwise Python's resource_tracker unlinks
+    them when the publisher exits and every later attach gets
+    FileNotFoundError. Nobody unlinks them automatically after that: the
+    next --shm run replaces them, and they otherwise persist in /dev/shm
+    until reboot or an explicit SharedMemory(name=...).unlink().
+    """
+    from multiprocessing import shared_memory, resource_tracker
+    from array import array
+
+    def _disown(seg):
+        # 3.13+ has SharedMemory(track=False); unregister is the portable way.
+        try:
+            resource_tracker.unregister(seg._name, "shared_memory")
+        except Exception:
+            pass
+
+    idx = array("q", bounds).tobytes()
+    for name in ("aer_wells", "aer_wells_idx"):
+        try:
+            old = shared_memory.SharedMemory(name=name)
+            _disown(old)  # don't let the tracker adopt (and later unlink) it
+            old.close(); old.unlink()  # replace any stale segment
+        except Exception:
+            pass
+    shm = shared_memory.SharedMemory(name="aer_wells", create=True, size=len(payload))
+    shm.buf[:len(payload)] = payload
+    _disown(shm)
+    shm.close()
+    shm_i = shared_memory.SharedMemory(name="aer_wells_idx", create=True, size=len(idx))
+    shm_i.buf[:len(idx)] = idx
+    _disown(shm_i)
+    shm_i.close()
+    return len(payload)
 
 def main():
     ap = argparse.ArgumentParser(description="Split wells.txt into N parts.")
     ap.add_argument("master", nargs="?", default="wells.txt", help="Path to master wells file")
     ap.add_argument("--outdir", default="wells_parts", help="Output directory for parts")
     ap.add_argument("--parts", type=int, default=30, help="Number of parts")
+    ap.add_argument("--single-file", action="store_true",
+                    help="Write one wells_all.bin + wells_all.idx offset sidecar instead of per-part files")
+    ap.add_argument("--shm", action="store_true",
+                    help="Also publish the cleaned master to shared memory for local workers")
     args = ap.parse_args()
 
     master = Path(args.master)
     if not master.is_file():
         raise SystemExit(f"[error] not found: {master}")
 
-    lines = load_clean_lines(master)
-    if not lines:
+    # Stream cleaned lines straight into one buffer, tracking per-line end
+    # offsets; no master list or per-part sublists are ever materialized.
+    buf = bytearray()
+    offs = [0]
+    for l in load_clean_lines(master):
+        buf += l
+        buf += b"\n"
+        offs.append(len(buf))
+    nlines = len(offs) - 1
+    if nlines == 0:
         raise SystemExit("[error] no wells after cleaning (empty or only comments)")
 
-    Path(args.outdir).mkdir(parents=True, exist_ok=True)
+    outdir = Path(args.outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
     width = max(2, len(str(args.parts - 1)))  # zero-padding width
+    fmt = f"wells_{{:0{width}d}}.txt"        # hoisted: one format spec for the loop
+
+    if args.parts == 1:
+        # Degenerate case: the whole master is the single part. Hardlink it
+        # (copy on filesystems without link support) instead of re-encoding.
+        outp = outdir / fmt.format(0)
+        try:
+            outp.unlink(missing_ok=True)
+            os.link(str(master), str(outp))
+        except OSError:
+            import shutil
+            shutil.copyfile(str(master), str(outp))
+        print(f"[ok] wrote 1 part to {args.outdir}/ (linked master verbatim)")
+        return
+
+    # Each part is a byte range of the streamed buffer: boundaries come from
+    # the per-line offsets, one pwrite per part, no copying.
+    clean_bytes = bytes(buf)
+    mv = memoryview(clean_bytes)
+    bounds = [0]
+    i = 0
+    for sz in chunk_sizes(nlines, args.parts):
+        i += sz
+        bounds.append(offs[i])
+    nparts = len(bounds) - 1
+
+    if args.single_file:
+        # One data file + offset sidecar instead of N inodes; consumers mmap
+        # wells_all.bin and slice [idx[k]:idx[k+1]].
+        from array import array
+        views = [mv[bounds[k]:bounds[k+1]] for k in range(nparts)]
+        fd = os.open(str(outdir / "wells_all.bin"), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            for i in range(0, len(views), 1024):  # IOV_MAX per writev call
+                os.writev(fd, views[i:i+1024])
+            if _FADVISE:
+                _FADVISE(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+        (outdir / "wells_all.idx").write_bytes(array("q", bounds).tobytes())
+        if args.shm:
+            size = publish_shared_master(clean_bytes, bounds)
+            print(f"[ok] published shared master 'aer_wells' ({size} bytes, {nparts} parts)")
+        print(f"[ok] wrote wells_all.bin + wells_all.idx to {args.outdir}/ ({nparts} parts)")
+        return
 
-    groups = chunks_even(lines, args.parts)
     count = 0
-    for i, g in enumerate(groups):
-        outp = Path(args.outdir) / f"wells_{i:0{width}d}.txt"
-        outp.write_text("\n".join(g) + "\n", encoding="utf-8")
+    for i in range(nparts):
+        outp = outdir / fmt.format(i)
+        write_part(outp, mv[bounds[i]:bounds[i+1]])
         count += 1
 
+    if args.shm:
+        size = publish_shared_master(clean_bytes, bounds)
+        print(f"[ok] published shared master 'aer_wells' ({size} bytes, {nparts} parts)")
+
     print(f"[ok] wrote {count} parts to {args.outdir}/ (zero-padded to width {width})")
 
 if __name__ == "__main__":
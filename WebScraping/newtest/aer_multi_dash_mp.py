@@ -1,11 +1,14 @@
 # aer_multi_dash_mp.py
 # Simple, fast, multi-machine Tableau scraper with per-well S3 state and locks.
 
-import os, sys, time, re, shutil, argparse, html, csv, io, platform, json, signal
+import os, sys, time, re, shutil, argparse, html, csv, io, platform, json, signal, functools, threading
+from collections import Counter
 from datetime import datetime, timezone
 from pathlib import Path
 from urllib.parse import quote
-from multiprocessing import Process, set_start_method
+from multiprocessing import Process, Queue, set_start_method, set_forkserver_preload
+from queue import Empty
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait
 from typing import List, Optional, Dict, Tuple
 
 # ========= Minimal logging =========
@@ -17,25 +20,29 @@ def log_s3(msg: str): print(f"[{ts()}][S3] {msg}", flush=True)
 try:
     from s3_merge import (
         s3_read_text, s3_put_text, s3_list_prefix,
-        s3_exists, s3_copyto_if_new
+        s3_exists, s3_copyto_if_new, prefetch_prefix
     )
 except Exception:
     def s3_read_text(key: str) -> Optional[str]: return None
     def s3_put_text(key: str, text: str) -> bool: return False
     def s3_list_prefix(prefix: str) -> List[str]: return []
+    def prefetch_prefix(prefix: str) -> set: return set()
     def s3_exists(key: str) -> bool: return False
     def s3_copyto_if_new(path: Path, key: str) -> bool: return False
 
 # ========= Locks =========
 try:
-    from s3_lock import acquire_lock, release_lock, start_lock_heartbeat, purge_expired_locks
+    from s3_lock import (acquire_lock, release_lock, start_lock_heartbeat,
+                         purge_expired_locks, start_purge_daemon)
 except Exception:
     def acquire_lock(lock_id: str) -> bool: return True
     def release_lock(lock_id: str) -> None: pass
     class _HB:
+        def touch(self): pass
         def stop(self): pass
     def start_lock_heartbeat(lock_id: str): return _HB()
     def purge_expired_locks(): pass
+    def start_purge_daemon(): return None
 
 # ========= Config =========
 WELLS_FILE = "wells.txt"
@@ -45,7 +52,7 @@ DELAY      = 0.15
 WORKERS    = 2
 
 # Tableau settle & retries (simple but effective)
-VIZ_SETTLE_SECONDS = 30
+VIZ_SETTLE_MAX = 20          # cap on waiting for the viz/crosstab to become ready
 EMPTY_SHEETS_RETRIES = 2
 
 # CSV normalization toggles
@@ -54,6 +61,10 @@ ADD_UWI_SHORT     = True
 ADD_PROVENANCE    = True
 STRIP_EMPTY_TRAILING_COLS = True
 
+# Flush per-well state to S3 at most once per this many sheets (plus at
+# dashboard end); bounds lost progress on crash without 2 RTTs per sheet.
+STATE_FLUSH_EVERY = 5
+
 # ========= Dashboards =========
 DASHBOARDS: Dict[str, str] = {
     "Well_Summary_Report":
@@ -64,6 +75,8 @@ DASHBOARDS: Dict[str, str] = {
         "https://www2.aer.ca/t/Production/views/0150_IMB_Well_Reservoir_Eval_EXT/ResourceEvaluation",
 }
 
+_DASHBOARD_KEYS = frozenset(DASHBOARDS)
+
 FLAGS = {
     "Well_Summary_Report": (
         "&%3Aembed=y&%3AshowShareOptions=true&%3Adisplay_count=no&%3AshowVizHome=no&%3Atoolbar=yes"
@@ -84,12 +97,16 @@ FRAGMENTS = {
 
 # ========= Small utils =========
 def pause(): time.sleep(DELAY)
+@functools.lru_cache(maxsize=4096)
 def sanitize_name(s: str) -> str: return re.sub(r"[^A-Za-z0-9_.-]+", "_", (s or "").strip())
+@functools.lru_cache(maxsize=4096)
 def well_label_from_entry(raw_uwi: str) -> str: return sanitize_name((raw_uwi or "").strip().replace("/", "_"))
 WRAPPED_RE = re.compile(r"^([A-Z0-9]{1,2})/(.+)/(\d)$")
+@functools.lru_cache(maxsize=4096)
 def ensure_wrapped(uwi: str) -> str:
     u = (uwi or "").strip(); m = WRAPPED_RE.match(u)
     return u if m else f"00/{u}/0"
+@functools.lru_cache(maxsize=4096)
 def to_short_uwi(uwi: str) -> str:
     m = WRAPPED_RE.match((uwi or "").strip())
     return m.group(2) if m else uwi
@@ -98,27 +115,53 @@ def url_for(code: str, base: str, wrapped: str) -> str:
     return f"{base}?{key}={val}{FLAGS.get(code,'')}{FRAGMENTS.get(code,'')}"
 
 # ========= Per-well state (single JSON) =========
+# While a worker holds the well lock it is the only writer of that state, so
+# reads within the process can be served from memory instead of S3.
+_STATE_CACHE: Dict[str, dict] = {}
+_MANIFEST_CACHE: Dict[Tuple[str, str], List[str]] = {}
+# _post futures on the io_pool mutate well state while state_save may be
+# serializing the same dicts on another pool thread; every state touch
+# goes through this lock. RLock because mark-done helpers call state_save.
+_STATE_LOCK = threading.RLock()
+
 def state_key(well_label: str) -> str:
     return f"state/wells/{well_label}.json"
 
+def flags_key(well_label: str) -> str:
+    # tiny sidecar listing complete dashboard codes; lets the common
+    # "already done" check read a few bytes instead of the full state JSON
+    return f"state/wells/{well_label}.flags"
+
 def state_load(well_label: str) -> dict:
+    cached = _STATE_CACHE.get(well_label)
+    if cached is not None:
+        return cached
     txt = s3_read_text(state_key(well_label))
-    if not txt:
-        return {"well_label": well_label, "uwi_wrapped": "", "dashboards": {}, "updated_at": datetime.now(timezone.utc).isoformat()}
-    try:
-        obj = json.loads(txt.lstrip("\ufeff"))
-    except Exception:
-        # corrupt -> return minimal; we won't overwrite unless we hold the lock
-        return {"well_label": well_label, "uwi_wrapped": "", "dashboards": {}, "updated_at": datetime.now(timezone.utc).isoformat()}
+    obj = None
+    if txt:
+        try:
+            obj = json.loads(txt.lstrip("\ufeff"))
+        except Exception:
+            # corrupt -> return minimal; we won't overwrite unless we hold the lock
+            obj = None
+    if obj is None:
+        obj = {"well_label": well_label, "uwi_wrapped": "", "dashboards": {}, "updated_at": datetime.now(timezone.utc).isoformat()}
     obj.setdefault("dashboards", {})
     obj.setdefault("uwi_wrapped", "")
+    _STATE_CACHE[well_label] = obj
     return obj
 
 def state_save(well_state: dict):
-    well_state["updated_at"] = datetime.now(timezone.utc).isoformat()
-    s3_put_text(state_key(well_state["well_label"]), json.dumps(well_state, indent=2, sort_keys=True))
+    with _STATE_LOCK:
+        well_state["updated_at"] = datetime.now(timezone.utc).isoformat()
+        _STATE_CACHE[well_state["well_label"]] = well_state
+        payload = json.dumps(well_state, indent=2, sort_keys=True)
+    s3_put_text(state_key(well_state["well_label"]), payload)
     log_s3(f"state saved -> {state_key(well_state['well_label'])}")
 
+def state_cache_evict(well_label: str):
+    _STATE_CACHE.pop(well_label, None)
+
 def state_ensure_well(raw_uwi: str, wrapped: str, well_label: str):
     st = state_load(well_label)
     st["well_label"] = well_label
@@ -127,33 +170,49 @@ def state_ensure_well(raw_uwi: str, wrapped: str, well_label: str):
     state_save(st)
 
 def state_list_incomplete_sheets(well_state: dict, dash_code: str, all_sheets: List[str]) -> List[str]:
-    d = well_state["dashboards"].setdefault(dash_code, {"status": "incomplete", "files": {}, "last_update": ""})
-    files = d.setdefault("files", {})
-    # ensure every sheet has an entry
-    for s in all_sheets:
-        files.setdefault(s, {"status": "incomplete", "s3_key": ""})
-    # incomplete list
-    return [s for s in all_sheets if files.get(s, {}).get("status") != "complete"]
+    with _STATE_LOCK:
+        d = well_state["dashboards"].setdefault(dash_code, {"status": "incomplete", "files": {}, "last_update": ""})
+        files = d.setdefault("files", {})
+        # ensure every sheet has an entry
+        for s in all_sheets:
+            files.setdefault(s, {"status": "incomplete", "s3_key": ""})
+        # incomplete list
+        return [s for s in all_sheets if files.get(s, {}).get("status") != "complete"]
+
+def _mark_sheet_complete_in_memory(st: dict, dash_code: str, sheet: str, s3_key: str):
+    """Pure dict mutation; caller decides when to flush with state_save."""
+    with _STATE_LOCK:
+        d = st["dashboards"].setdefault(dash_code, {"status": "incomplete", "files": {}, "last_update": ""})
+        f = d["files"].setdefault(sheet, {"status": "incomplete", "s3_key": ""})
+        f["status"] = "complete"; f["s3_key"] = s3_key; d["last_update"] = datetime.now(timezone.utc).isoformat()
+        # dashboard completion?
+        all_complete = all(meta.get("status") == "complete" for meta in d["files"].values()) if d["files"] else True
+        d["status"] = "complete" if all_complete else "incomplete"
 
 def state_mark_sheet_complete(well_label: str, dash_code: str, sheet: str, s3_key: str):
     st = state_load(well_label)
-    d = st["dashboards"].setdefault(dash_code, {"status": "incomplete", "files": {}, "last_update": ""})
-    f = d["files"].setdefault(sheet, {"status": "incomplete", "s3_key": ""})
-    f["status"] = "complete"; f["s3_key"] = s3_key; d["last_update"] = datetime.now(timezone.utc).isoformat()
-    # dashboard completion?
-    all_complete = all(meta.get("status") == "complete" for meta in d["files"].values()) if d["files"] else True
-    d["status"] = "complete" if all_complete else "incomplete"
+    _mark_sheet_complete_in_memory(st, dash_code, sheet, s3_key)
     state_save(st)
 
 def state_mark_dashboard_done(well_label: str, dash_code: str):
     st = state_load(well_label)
-    d = st["dashboards"].setdefault(dash_code, {"status": "incomplete", "files": {}, "last_update": ""})
-    all_complete = all(meta.get("status") == "complete" for meta in d["files"].values()) if d["files"] else True
-    d["status"] = "complete" if all_complete else "incomplete"
-    d["last_update"] = datetime.now(timezone.utc).isoformat()
-    state_save(st)
+    with _STATE_LOCK:
+        d = st["dashboards"].setdefault(dash_code, {"status": "incomplete", "files": {}, "last_update": ""})
+        all_complete = all(meta.get("status") == "complete" for meta in d["files"].values()) if d["files"] else True
+        d["status"] = "complete" if all_complete else "incomplete"
+        d["last_update"] = datetime.now(timezone.utc).isoformat()
+        state_save(st)
+        complete = sorted(c for c, meta in st["dashboards"].items() if meta.get("status") == "complete")
+    if complete:
+        s3_put_text(flags_key(well_label), ",".join(complete))
 
 def can_skip_well_by_state(well_label: str, dashboards: List[str]) -> bool:
+    # fast path: a few-byte flags read instead of the full state JSON
+    txt = s3_read_text(flags_key(well_label))
+    if txt:
+        have = {p.strip() for p in txt.split(",") if p.strip()}
+        if all(code in have for code in dashboards):
+            return True
     st = state_load(well_label)
     d = st.get("dashboards", {})
     if not d: return False
@@ -192,9 +251,27 @@ def find_browser_binary():
         if c and os.path.exists(c): return c
     return None
 
+# Telemetry/analytics beacons keep network activity alive long after the viz
+# itself is usable; blocking them shortens readiness waits.
+TELEMETRY_BLOCK_URLS = [
+    "*google-analytics*", "*googletagmanager*", "*doubleclick*", "*hotjar*",
+    "*.clarity.ms/*", "*segment.io*", "*/telemetry/*", "*/newrelic*", "*bam.nr-data.net*",
+]
+
+def _block_telemetry(driver):
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": TELEMETRY_BLOCK_URLS})
+    except Exception:
+        pass  # CDP not available on this driver; harmless
+
 def make_driver(download_dir: Path, headless: bool):
     system = platform.system().lower()
     devnull = "NUL" if system == "windows" else os.devnull
+    # Persistent per-worker profile: Tableau's JS bundles stay in disk cache
+    # across wells instead of being re-fetched on every driver.get.
+    profile_dir = download_dir / "profile"
+    profile_dir.mkdir(parents=True, exist_ok=True)
     try:
         from selenium.webdriver.chrome.options import Options as ChromeOptions
         opts = ChromeOptions()
@@ -203,6 +280,9 @@ def make_driver(download_dir: Path, headless: bool):
         else:
             if headless: opts.add_argument("--disable-gpu")
         opts.add_argument("--window-size=1400,1000")
+        opts.add_argument(f"--user-data-dir={profile_dir.resolve()}")
+        opts.add_argument("--disk-cache-size=268435456")
+        opts.add_argument("--aggressive-cache-discard=false")
         opts.add_argument("--log-level=3"); opts.add_argument("--disable-logging"); opts.add_experimental_option("excludeSwitches", ["enable-logging"])
         opts.add_experimental_option("prefs", {
             "download.default_directory": str(download_dir.resolve()),
@@ -215,13 +295,18 @@ def make_driver(download_dir: Path, headless: bool):
         if binpath and os.path.basename(binpath).lower().startswith(("chrome", "chromium")):
             opts.binary_location = binpath
         service = ChromeService(log_output=devnull)
-        return webdriver.Chrome(options=opts, service=service)
+        driver = webdriver.Chrome(options=opts, service=service)
+        _block_telemetry(driver)
+        return driver
     except Exception as e:
         try:
             from selenium.webdriver.edge.options import Options as EdgeOptions
             opts = EdgeOptions()
             if headless: opts.add_argument("--headless=new"); opts.add_argument("--disable-gpu")
             opts.add_argument("--window-size=1400,1000")
+            opts.add_argument(f"--user-data-dir={profile_dir.resolve()}")
+            opts.add_argument("--disk-cache-size=268435456")
+            opts.add_argument("--aggressive-cache-discard=false")
             opts.add_experimental_option("excludeSwitches", ["enable-logging"])
             opts.add_experimental_option("prefs", {
                 "download.default_directory": str(download_dir.resolve()),
@@ -234,15 +319,32 @@ def make_driver(download_dir: Path, headless: bool):
             if binpath and os.path.basename(binpath).lower().startswith("msedge"):
                 opts.binary_location = binpath
             service = EdgeService(log_output=devnull)
-            return webdriver.Edge(options=opts, service=service)
+            driver = webdriver.Edge(options=opts, service=service)
+            _block_telemetry(driver)
+            return driver
         except Exception as e2:
             raise RuntimeError(f"Cannot start Chrome or Edge. Chrome error: {e}\nEdge error: {e2}")
 
+# ========= Selector constants (hot paths; built once) =========
+DL_ICON_CSS      = "[data-tb-test-id='tb-icons-DownloadBaseIcon']"
+DIALOG_XP        = "//*[@role='dialog']"
+DIALOG_THUMB_XP  = "//*[@role='dialog']//*[starts-with(@data-tb-test-id,'sheet-thumbnail-')]"
+CROSSTAB_MENU_XP = "//*[@data-tb-test-id='download-flyout-TextMenuItem' and .//span[normalize-space()='Crosstab']]"
+CLOSE_BTN_XPS    = ("//*[@role='dialog']//button[@aria-label='Close']",
+                    "//*[@role='dialog']//button[normalize-space()='Close']")
+CSV_RADIO_XPS    = (".//label[@data-tb-test-id='crosstab-options-dialog-radio-csv-Label']",
+                    ".//label[normalize-space()='CSV']",
+                    ".//*[normalize-space()='CSV']")
+EXPORT_BTN_CSS   = "[data-tb-test-id='export-crosstab-export-Button']"
+EXPORT_BTN_XPS   = (".//button[normalize-space()='Download']", ".//button[@type='submit']")
+OPT_BY_TITLE_TMPL   = ".//*[@role='option' and @title=%s]"
+THUMB_BY_TITLE_TMPL = ".//span[contains(@class,'thumbnail-title') and normalize-space()=%s]/ancestor::*[@role='option']"
+
 def enter_viz_context(driver, timeout: int):
     driver.switch_to.default_content()
     try:
         WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "[data-tb-test-id='tb-icons-DownloadBaseIcon']"))
+            EC.presence_of_element_located((By.CSS_SELECTOR, DL_ICON_CSS))
         ); return
     except Exception:
         pass
@@ -251,69 +353,174 @@ def enter_viz_context(driver, timeout: int):
             driver.switch_to.default_content()
             driver.switch_to.frame(fr)
             WebDriverWait(driver, int(timeout/2)).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "[data-tb-test-id='tb-icons-DownloadBaseIcon']"))
+                EC.presence_of_element_located((By.CSS_SELECTOR, DL_ICON_CSS))
             ); return
         except Exception:
             continue
     raise RuntimeError("Download icon not found (toolbar hidden or layout changed).")
 
+# Observed time-to-ready per dashboard; after a few samples the wait budget
+# shrinks from the global timeout to ~1.5x the dashboard's own p90.
+_SETTLE_STATS: Dict[str, List[float]] = {}
+_SETTLE_LOGGED: set = set()
+
+def _settle_budget(dash_code: str, default_timeout: float) -> float:
+    samples = _SETTLE_STATS.get(dash_code, [])
+    if len(samples) < 3:
+        return default_timeout
+    s = sorted(samples)
+    p90 = s[min(len(s) - 1, int(0.9 * len(s)))]
+    budget = min(60.0, max(5.0, 1.5 * p90))
+    if dash_code not in _SETTLE_LOGGED:
+        _SETTLE_LOGGED.add(dash_code)
+        log(f"      [{dash_code}] settle budget tuned to {budget:.1f}s (from {len(s)} samples)")
+    return budget
+
+def wait_viz_ready(driver, timeout: int, dash_code: Optional[str] = None):
+    """Wait until the toolbar Download icon is clickable instead of a blanket settle sleep."""
+    budget = _settle_budget(dash_code, timeout) if dash_code else timeout
+    t0 = time.time()
+    try:
+        WebDriverWait(driver, budget).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, DL_ICON_CSS))
+        )
+    except TimeoutException:
+        if not dash_code or budget >= timeout:
+            raise
+        # The tuned budget only ever learns from successes; without this
+        # a few fast loads would pin it low and every slower load would
+        # error forever. Record the miss so the budget widens, then give
+        # the load the full configured timeout before failing.
+        _SETTLE_STATS.setdefault(dash_code, []).append(budget)
+        WebDriverWait(driver, timeout).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, DL_ICON_CSS))
+        )
+    if dash_code:
+        _SETTLE_STATS.setdefault(dash_code, []).append(time.time() - t0)
+    time.sleep(1.0)  # small floor for toolbar animation
+
+def wait_crosstab_sheets(driver) -> bool:
+    """After open_crosstab: wait for at least one sheet thumbnail to render.
+    Returns False on timeout (some dashboards genuinely have no sheets)."""
+    try:
+        WebDriverWait(driver, VIZ_SETTLE_MAX).until(
+            EC.presence_of_element_located((
+                By.XPATH, DIALOG_THUMB_XP
+            ))
+        )
+        return True
+    except TimeoutException:
+        return False
+
 def open_download_flyout(driver, timeout: int):
     icon = WebDriverWait(driver, timeout).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "[data-tb-test-id='tb-icons-DownloadBaseIcon']"))
+        EC.presence_of_element_located((By.CSS_SELECTOR, DL_ICON_CSS))
     )
     driver.execute_script("arguments[0].closest('button').click();", icon); pause()
 
 def open_crosstab(driver, timeout: int):
     item = WebDriverWait(driver, timeout).until(
         EC.element_to_be_clickable((
-            By.XPATH, "//*[@data-tb-test-id='download-flyout-TextMenuItem' and .//span[normalize-space()='Crosstab']]"
+            By.XPATH, CROSSTAB_MENU_XP
         ))
     )
     driver.execute_script("arguments[0].click();", item); pause()
 
 def close_dialog(driver):
-    for xp in ["//*[@role='dialog']//button[@aria-label='Close']", "//*[@role='dialog']//button[normalize-space()='Close']"]:
+    for xp in CLOSE_BTN_XPS:
         try: driver.find_element(By.XPATH, xp).click(); pause(); return
         except Exception: pass
     try: driver.switch_to.active_element.send_keys("\ue00c"); pause()
     except Exception: pass
 
+_JS_CSV_CHECKED = """
+const el = document.querySelector("[data-tb-test-id='crosstab-options-dialog-radio-csv-RadioButton']")
+        || document.querySelector("input[type='radio'][value='csv' i]");
+return !!(el && el.checked);
+"""
+
+def csv_format_selected(driver) -> bool:
+    """One JS round-trip; the radio state persists across sheet selections."""
+    try: return bool(driver.execute_script(_JS_CSV_CHECKED))
+    except Exception: return False
+
 def ensure_csv_format(driver, timeout: int):
-    dlg = WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.XPATH, "//*[@role='dialog']")))
-    for xp in [".//label[@data-tb-test-id='crosstab-options-dialog-radio-csv-Label']",
-               ".//label[normalize-space()='CSV']",
-               ".//*[normalize-space()='CSV']"]:
+    dlg = WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.XPATH, DIALOG_XP)))
+    for xp in CSV_RADIO_XPS:
         try: el = dlg.find_element(By.XPATH, xp); driver.execute_script("arguments[0].click();", el); pause(); return
         except Exception: pass
 
+# Each get_attribute/.text on a WebElement is a round-trip to the browser;
+# these scripts collect or act on all candidates in one call.
+_JS_LIST_THUMBS = """
+const dlg = document.querySelector("[role='dialog']");
+if (!dlg) return [];
+return Array.from(dlg.querySelectorAll("[data-tb-test-id^='sheet-thumbnail-']"))
+  .map(n => (n.getAttribute('title') || n.querySelector('span.thumbnail-title')?.textContent || n.textContent || '').trim())
+  .filter(Boolean);
+"""
+
+_JS_SELECTED_SHEET = """
+const dlg = document.querySelector("[role='dialog']");
+if (!dlg) return null;
+const el = dlg.querySelector("[role='option'][aria-selected='true']");
+if (!el) return null;
+return (el.getAttribute('title') || el.querySelector('span.thumbnail-title')?.textContent || el.textContent || '').trim() || null;
+"""
+
+_JS_SELECT_SHEET = """
+const name = (arguments[0] || '').trim();
+const dlg = document.querySelector("[role='dialog']");
+if (!dlg) return false;
+for (const el of dlg.querySelectorAll("[role='option']")) {
+  const t = (el.getAttribute('title') || el.querySelector('span.thumbnail-title')?.textContent || el.textContent || '').trim();
+  if (t === name) { el.click(); return true; }
+}
+return false;
+"""
+
+def list_dialog_sheet_titles(driver) -> List[str]:
+    try:
+        titles = driver.execute_script(_JS_LIST_THUMBS) or []
+    except Exception:
+        return []
+    names = []
+    for t in titles:
+        if t and t not in names: names.append(t)
+    return names
+
 def get_selected_sheet_name(driver) -> Optional[str]:
-    dlg = driver.find_element(By.XPATH, "//*[@role='dialog']")
-    try: el = dlg.find_element(By.XPATH, ".//*[@role='option' and @aria-selected='true']")
-    except Exception: return None
-    name = (el.get_attribute("title") or "").strip()
-    if not name:
-        try: name = el.find_element(By.XPATH, ".//span[contains(@class,'thumbnail-title')]").text.strip()
-        except Exception: name = el.text.strip()
-    return name or None
+    try:
+        return driver.execute_script(_JS_SELECTED_SHEET) or None
+    except Exception:
+        return None
 
 def select_sheet_by_name(driver, sheet_name: str):
-    dlg = driver.find_element(By.XPATH, "//*[@role='dialog']")
     try:
-        el = dlg.find_element(By.XPATH, f".//*[@role='option' and @title={xpath_literal(sheet_name)}]")
+        ok = driver.execute_script(_JS_SELECT_SHEET, sheet_name)
+    except Exception:
+        ok = False
+    if ok:
+        pause(); return
+    # fallback: resolve the option element the slow way
+    dlg = driver.find_element(By.XPATH, DIALOG_XP)
+    try:
+        el = dlg.find_element(By.XPATH, OPT_BY_TITLE_TMPL % xpath_literal(sheet_name))
     except Exception:
-        el = dlg.find_element(By.XPATH, f".//span[contains(@class,'thumbnail-title') and normalize-space()={xpath_literal(sheet_name)}]/ancestor::*[@role='option']")
+        el = dlg.find_element(By.XPATH, THUMB_BY_TITLE_TMPL % xpath_literal(sheet_name))
     driver.execute_script("arguments[0].click();", el); pause()
 
 def click_dialog_export(driver):
-    dlg = driver.find_element(By.XPATH, "//*[@role='dialog']")
-    for css in ["[data-tb-test-id='export-crosstab-export-Button']"]:
+    dlg = driver.find_element(By.XPATH, DIALOG_XP)
+    for css in (EXPORT_BTN_CSS,):
         try: btn = dlg.find_element(By.CSS_SELECTOR, css); driver.execute_script("arguments[0].click();", btn); return
         except Exception: pass
-    for xp in [".//button[normalize-space()='Download']", ".//button[@type='submit']"]:
+    for xp in EXPORT_BTN_XPS:
         try: btn = dlg.find_element(By.XPATH, xp); driver.execute_script("arguments[0].click();", btn); return
         except Exception: pass
     raise RuntimeError("Export button not found")
 
+@functools.lru_cache(maxsize=512)
 def xpath_literal(s):
     if "'" not in s: return f"'{s}'"
     if '"' not in s: return f'"{s}"'
@@ -336,22 +543,37 @@ def _guess_ext(p: Path) -> str:
 def wait_for_download_and_move(worker_download_dir: Path, target_dir: Path,
                                well_label: str, sheet_name: str, timeout=180) -> Optional[Path]:
     start = time.time(); deadline = start + timeout
-    before = set(p for p in worker_download_dir.glob("*") if p.suffix.lower() in VALID_EXTS)
+
+    def _scan():
+        # One scandir per tick; DirEntry caches stat, no per-file syscalls.
+        entries = {}; partial = False
+        try:
+            for e in os.scandir(worker_download_dir):
+                if not e.is_file(): continue
+                if e.name.endswith(".crdownload"): partial = True; continue
+                entries[e.name] = e.stat().st_mtime
+        except FileNotFoundError:
+            pass
+        return entries, partial
+
+    before, _ = _scan()
     candidate = None
     while time.time() < deadline:
-        now = set(p for p in worker_download_dir.glob("*") if p.suffix.lower() in VALID_EXTS)
-        new_files = list(now - before)
-        if new_files:
-            new_files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-            f = new_files[0]
-            if _size_stable(f): candidate = f; break
-        time.sleep(0.25)
+        now, partial = _scan()
+        new_names = [n for n in now if n not in before and Path(n).suffix.lower() in VALID_EXTS]
+        if new_names:
+            new_names.sort(key=lambda n: now[n], reverse=True)
+            f = worker_download_dir / new_names[0]
+            # .crdownload gone means Chrome finished and renamed; accept at once.
+            if not partial or _size_stable(f, dwell=0.2):
+                candidate = f; break
+        time.sleep(0.1)
     if candidate is None:
-        files = [p for p in worker_download_dir.glob("*") if not p.name.endswith(".crdownload")]
+        files, _ = _scan()
         if not files: return None
-        files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-        f = files[0];
-        if not _size_stable(f): return None
+        name = max(files, key=files.get)
+        f = worker_download_dir / name
+        if not _size_stable(f, dwell=0.2): return None
         candidate = f
 
     ext = candidate.suffix.lower()
@@ -376,19 +598,26 @@ def _detect_delimiter(text: str) -> str:
     if not lines: return ","
     best, best_var, best_modal = ",", float("inf"), 0
     for d in CAND:
-        cols = [ln.count(d) + 1 for ln in lines]
-        modal = max(set(cols), key=cols.count)
-        var = sum((c - modal) ** 2 for c in cols)
+        c = Counter(ln.count(d) + 1 for ln in lines)
+        modal, _ = c.most_common(1)[0]
+        var = sum((k - modal) ** 2 * v for k, v in c.items())
         if (var < best_var) or (var == best_var and modal > best_modal):
             best, best_var, best_modal = d, var, modal
+        if var == 0 and modal > 1:
+            break  # perfectly consistent multi-column split; no better candidate
     return best
 
+# Tableau crosstab exports are UTF-8 or BOM'd UTF-16; a 4-byte BOM check is
+# enough. Set AER_ASSUME_UTF8=0 to re-enable the cp1252/NUL heuristics.
+ASSUME_UTF8 = os.environ.get("AER_ASSUME_UTF8", "1") != "0"
+
 def _sniff_text_encoding(path: Path) -> str:
     with open(path, "rb") as fb:
-        head = fb.read(4096)
+        head = fb.read(4 if ASSUME_UTF8 else 4096)
     if head.startswith(b"\xff\xfe"): return "utf-16-le"
     if head.startswith(b"\xfe\xff"): return "utf-16-be"
     if head.startswith(b"\xef\xbb\xbf"): return "utf-8-sig"
+    if ASSUME_UTF8: return "utf-8"
     if b"\x00" in head[:100]: return "utf-16-le"
     try: head.decode("utf-8"); return "utf-8"
     except Exception: return "cp1252"
@@ -417,70 +646,112 @@ def sniff_csv_dialect_and_newline(raw: str):
             quoting          = csv.QUOTE_MINIMAL
         return Fallback, line_term
 
-def _norm_header(h: str) -> str: return re.sub(r"[^a-z0-9]+", "", (h or "").strip().lower())
+_NORM_HEADER_RE = re.compile(r"[^a-z0-9]+")
+@functools.lru_cache(maxsize=8192)
+def _norm_header(h: str) -> str: return _NORM_HEADER_RE.sub("", (h or "").strip().lower())
 BASE_FORMATTED_SYNS = {"wellidentifier", "formatteduwi", "welluwiformatted", "enterwellidentifieruwi", "prodstringuwiformatted"}
 NUMERIC_UWI_SYNS = {"welluwi","welluwi.","welluwi ","welluwi_","welluwi-"}
+# One indexed lookup for the known synonyms; the substring probes below only
+# run for headers that miss this table.
+SYN_MAP = {**{k: "UWI_Formatted" for k in BASE_FORMATTED_SYNS},
+           **{k: "UWI_Numeric" for k in NUMERIC_UWI_SYNS}}
 
 def normalize_csv_file(path: Path, well_label: str, wrapped_uwi: str, dashboard: str, sheet: str):
     if path.suffix.lower() != ".csv": return
     enc = _sniff_text_encoding(path)
-    raw = path.read_text(encoding=enc, errors="replace")
-    dialect, _ = sniff_csv_dialect_and_newline(raw)
-    rows = list(csv.reader(io.StringIO(raw), dialect=dialect))
-    if not rows: return
-    header = [(h or "").strip() for h in rows[0]]
-    data   = [list(r) for r in rows[1:]]
-    mapped = []; seen_formatted_idx = None
-    for i, h in enumerate(header):
-        key = _norm_header(h)
-        if key in BASE_FORMATTED_SYNS or ("uwi" in key and "formatted" in key) or key == "wellidentifier":
-            mapped.append("UWI_Formatted"); seen_formatted_idx = i
-        elif (key in NUMERIC_UWI_SYNS) or ("uwi" in key and "formatted" not in key and "identifier" not in key):
-            mapped.append("UWI_Numeric")
-        else:
-            mapped.append(h)
-    header = mapped
-    for r in data:
-        if len(r) < len(header): r += [""] * (len(header) - len(r))
-    if ADD_UWI_FORMATTED:
-        if seen_formatted_idx is None:
-            header.append("UWI_Formatted")
-            for r in data: r.append(wrapped_uwi)
+    # Sniff dialect on a small prefix; the file itself is streamed row-by-row
+    # (twice when column stripping is on, once otherwise) instead of being
+    # held in memory as text + row list + transposed columns.
+    with open(path, "r", encoding=enc, errors="replace", newline="") as f:
+        sample = f.read(65536)
+    if not sample: return
+    dialect, _ = sniff_csv_dialect_and_newline(sample)
+
+    def _open_rows():
+        fh = open(path, "r", encoding=enc, errors="replace", newline="")
+        return fh, csv.reader(fh, dialect=dialect)
+
+    fh, rdr = _open_rows()
+    try:
+        header_raw = next(rdr, None)
+        if header_raw is None: return
+        header = [(h or "").strip() for h in header_raw]
+        ncols = len(header)
+        mapped = []; seen_formatted_idx = None
+        for i, h in enumerate(header):
+            key = _norm_header(h)
+            tag = SYN_MAP.get(key)
+            if tag is None and "uwi" in key:
+                if "formatted" in key: tag = "UWI_Formatted"
+                elif "identifier" not in key: tag = "UWI_Numeric"
+            if tag == "UWI_Formatted":
+                mapped.append("UWI_Formatted"); seen_formatted_idx = i
+            elif tag == "UWI_Numeric":
+                mapped.append("UWI_Numeric")
+            else:
+                mapped.append(h)
+        header = mapped
+
+        if STRIP_EMPTY_TRAILING_COLS:
+            # Pass 1: flag columns with any non-empty cell; O(ncols) memory.
+            nonempty = bytearray(ncols)
+            remaining = ncols
+            for row in rdr:
+                for i in range(min(len(row), ncols)):
+                    if not nonempty[i] and (row[i] or "").strip():
+                        nonempty[i] = 1; remaining -= 1
+                if remaining == 0: break
+            keep_idx = [i for i in range(ncols) if nonempty[i]]
         else:
-            for r in data:
-                if not (r[seen_formatted_idx] or "").strip():
-                    r[seen_formatted_idx] = wrapped_uwi
-    if ADD_UWI_SHORT and "UWI_Short" not in header:
-        header.append("UWI_Short"); short = to_short_uwi(wrapped_uwi)
-        for r in data: r.append(short)
-    if ADD_PROVENANCE:
-        if "Dashboard" not in header:
-            header.append("Dashboard");
-        for r in data: r.append(dashboard)
-        if "Sheet" not in header:
-            header.append("Sheet");
-        for r in data: r.append(sheet)
-    out_rows = [header] + data
-    if STRIP_EMPTY_TRAILING_COLS:
-        cols = list(zip(*out_rows)); keep_idx = []
-        for i, col in enumerate(cols):
-            if any((c or "").strip() for c in col[1:]): keep_idx.append(i)
-        out_rows = [[r[i] for i in keep_idx] for r in out_rows]
+            keep_idx = list(range(ncols))
+    finally:
+        fh.close()
+
+    fill_formatted_idx = seen_formatted_idx if (ADD_UWI_FORMATTED and seen_formatted_idx is not None) else None
+    if fill_formatted_idx is not None and fill_formatted_idx not in keep_idx:
+        # column will be back-filled with the wrapped UWI, so keep it
+        keep_idx.append(fill_formatted_idx); keep_idx.sort()
+    add_formatted = ADD_UWI_FORMATTED and seen_formatted_idx is None
+    add_short = ADD_UWI_SHORT and "UWI_Short" not in header
+    add_dash  = ADD_PROVENANCE and "Dashboard" not in header
+    add_sheet = ADD_PROVENANCE and "Sheet" not in header
+    short = to_short_uwi(wrapped_uwi) if add_short else ""
+
+    # Constant per-row tail decided once, appended in a single concat below.
+    const_suffix = [x for x in (
+        wrapped_uwi if add_formatted else None,
+        short if add_short else None,
+        dashboard if add_dash else None,
+        sheet if add_sheet else None,
+    ) if x is not None]
+
+    out_header = [header[i] for i in keep_idx]
+    if add_formatted: out_header.append("UWI_Formatted")
+    if add_short: out_header.append("UWI_Short")
+    if add_dash:  out_header.append("Dashboard")
+    if add_sheet: out_header.append("Sheet")
+
     tmp = path.with_suffix(".csv.tmp")
-    with open(tmp, "w", encoding="utf-8-sig", newline="") as f:
-        class ExcelDialect(csv.Dialect):
-            delimiter=","
-            quotechar='"'
-            doublequote=True
-            skipinitialspace=False
-            lineterminator="\r\n"
-            quoting=csv.QUOTE_MINIMAL
-        w = csv.writer(f, dialect=ExcelDialect)
-        width = len(out_rows[0])
-        for r in out_rows:
-            if len(r) < width: r = r + [""]*(width-len(r))
-            elif len(r) > width: r = r[:width]
-            w.writerow(r)
+    fh, rdr = _open_rows()
+    try:
+        next(rdr, None)  # skip header
+        with open(tmp, "w", encoding="utf-8-sig", newline="") as f:
+            class ExcelDialect(csv.Dialect):
+                delimiter=","
+                quotechar='"'
+                doublequote=True
+                skipinitialspace=False
+                lineterminator="\r\n"
+                quoting=csv.QUOTE_MINIMAL
+            w = csv.writer(f, dialect=ExcelDialect)
+            w.writerow(out_header)
+            for row in rdr:
+                if len(row) < ncols: row = row + [""] * (ncols - len(row))
+                if fill_formatted_idx is not None and not (row[fill_formatted_idx] or "").strip():
+                    row[fill_formatted_idx] = wrapped_uwi
+                w.writerow([row[i] for i in keep_idx] + const_suffix)
+    finally:
+        fh.close()
     tmp.replace(path)
 
 # ========= Sheets manifest / discovery =========
@@ -488,68 +759,67 @@ def manifest_key(well_label: str, dash_code: str) -> str:
     return f"Data/{well_label}/{dash_code}/sheets.txt"
 
 def load_manifest_from_s3(well_label: str, dash_code: str) -> Optional[List[str]]:
+    cached = _MANIFEST_CACHE.get((well_label, dash_code))
+    if cached is not None:
+        return cached
     txt = s3_read_text(manifest_key(well_label, dash_code))
     if txt is None: return None
-    return [ln.strip() for ln in txt.splitlines() if ln.strip()]
+    sheets = [ln.strip() for ln in txt.splitlines() if ln.strip()]
+    _MANIFEST_CACHE[(well_label, dash_code)] = sheets
+    return sheets
 
 def save_manifest_to_s3(well_label: str, dash_code: str, sheets: List[str]):
+    _MANIFEST_CACHE[(well_label, dash_code)] = list(sheets)
     s3_put_text(manifest_key(well_label, dash_code), "\n".join(sheets))
     log_s3(f"uploaded manifest -> {manifest_key(well_label, dash_code)}")
 
 # ========= Scrape dashboard =========
 def discover_sheets(driver, timeout: int, dash_dir: Path, well_label: str, dash_code: str,
-                    dash_url: str) -> List[str]:
+                    dash_url: str) -> Tuple[List[str], bool]:
+    """Returns (sheets, already_at_dialog). When the second element is True the
+    crosstab dialog was left open on dash_url and the caller can export
+    without a second page load."""
     # First try existing manifest on S3
     s3_sheets = load_manifest_from_s3(well_label, dash_code)
     if s3_sheets is not None and len(s3_sheets) > 0:
         (dash_dir / "sheets.txt").write_text("\n".join(s3_sheets), encoding="utf-8")
-        return s3_sheets
+        return s3_sheets, False
 
     # Open viz and list
     driver.get(dash_url); pause()
     enter_viz_context(driver, timeout); pause()
-    time.sleep(VIZ_SETTLE_SECONDS)
+    wait_viz_ready(driver, timeout, dash_code)
 
     # open crosstab dialog
     open_download_flyout(driver, timeout); pause()
     open_crosstab(driver, timeout); pause()
+    wait_crosstab_sheets(driver)
 
-    # read thumbnails; if empty, refresh & retry
-    def list_thumbs() -> List[str]:
-        try:
-            dlg = driver.find_element(By.XPATH, "//*[@role='dialog']")
-            thumbs = dlg.find_elements(By.XPATH, ".//*[starts-with(@data-tb-test-id,'sheet-thumbnail-')]")
-            names = []
-            for t in thumbs:
-                title = (t.get_attribute("title") or "").strip()
-                if not title:
-                    try: title = t.find_element(By.XPATH, ".//span[contains(@class,'thumbnail-title')]").text.strip()
-                    except Exception: title = t.text.strip()
-                if title and title not in names: names.append(title)
-            return names
-        except Exception:
-            return []
-
-    sheets = list_thumbs()
+    # read thumbnails (one JS round-trip); if empty, refresh & retry
+    sheets = list_dialog_sheet_titles(driver)
     if not sheets:
         close_dialog(driver)
         for _ in range(EMPTY_SHEETS_RETRIES):
             driver.refresh(); time.sleep(2)
-            enter_viz_context(driver, timeout); time.sleep(VIZ_SETTLE_SECONDS)
+            enter_viz_context(driver, timeout); wait_viz_ready(driver, timeout, dash_code)
             open_download_flyout(driver, timeout); pause()
             open_crosstab(driver, timeout); pause()
-            sheets = list_thumbs()
+            wait_crosstab_sheets(driver)
+            sheets = list_dialog_sheet_titles(driver)
             if sheets: break
 
     # Save (even if empty)
     (dash_dir / "sheets.txt").write_text("\n".join(sheets), encoding="utf-8")
     save_manifest_to_s3(well_label, dash_code, sheets)
-    close_dialog(driver)
-    return sheets
+    if not sheets:
+        close_dialog(driver)
+        return [], False
+    # leave the dialog open; the caller can export from it directly
+    return sheets, True
 
 def process_dashboard(driver, worker_tmp_dir: Path, well_root: Path,
                       raw_uwi: str, well_label: str, wrapped: str,
-                      dash_code: str, timeout: int):
+                      dash_code: str, timeout: int, io_pool: Optional[ThreadPoolExecutor] = None):
     dash_dir = well_root / dash_code
     dash_dir.mkdir(parents=True, exist_ok=True)
 
@@ -557,7 +827,7 @@ def process_dashboard(driver, worker_tmp_dir: Path, well_root: Path,
     log(f"      [{dash_code}] -> {dash_url}")
 
     # discover sheets (use S3 manifest if available)
-    sheets = discover_sheets(driver, timeout, dash_dir, well_label, dash_code, dash_url)
+    sheets, at_dialog = discover_sheets(driver, timeout, dash_dir, well_label, dash_code, dash_url)
     log(f"      [{dash_code}] sheets: {sheets if sheets else '[]'}")
 
     # build/update state and figure incomplete
@@ -572,54 +842,104 @@ def process_dashboard(driver, worker_tmp_dir: Path, well_root: Path,
         s3_put_text(f"Data/{well_label}/.COMPLETE", "")
         return
 
+    if incompletes:
+        # One prefix listing catches uploads the state JSON lost track of,
+        # instead of re-exporting and re-checking sheet by sheet. Going
+        # through prefetch_prefix also warms the prefix cache, so the
+        # s3_exists/s3_copyto_if_new calls for this dashboard's uploads
+        # answer from the same listing. (No trailing slash: the cache is
+        # keyed the way _parent_and_name derives parents.)
+        existing = prefetch_prefix(f"Data/{well_label}/{dash_code}")
+        if existing:
+            still = []
+            for sheet in incompletes:
+                stem = f"{well_label}__{sanitize_name(sheet)}"
+                pat = re.compile(rf"^{re.escape(stem)}(_\d+)?\.(csv|xlsx)$")
+                hit = next((n for n in existing if pat.match(n)), None)
+                if hit:
+                    _mark_sheet_complete_in_memory(st, dash_code, sheet, f"Data/{well_label}/{dash_code}/{hit}")
+                else:
+                    still.append(sheet)
+            if len(still) != len(incompletes):
+                log(f"      [{dash_code}] {len(incompletes) - len(still)} sheet(s) already on S3 (prefix listing)")
+                state_save(st)
+                incompletes = still
+
     if not incompletes:
+        if at_dialog: close_dialog(driver)
         log(f"      [{dash_code}] ✓ already complete via state")
         state_mark_dashboard_done(well_label, dash_code)
         return
 
-    # Open viz/dialog once and export each needed sheet
-    driver.get(dash_url); pause()
-    enter_viz_context(driver, timeout); pause()
-    time.sleep(VIZ_SETTLE_SECONDS)
-    open_download_flyout(driver, timeout); pause()
-    open_crosstab(driver, timeout); pause()
+    # Reuse the dialog discover_sheets left open; otherwise open viz/dialog once
+    if not (at_dialog and driver.current_url == dash_url):
+        driver.get(dash_url); pause()
+        enter_viz_context(driver, timeout); pause()
+        wait_viz_ready(driver, timeout, dash_code)
+        open_download_flyout(driver, timeout); pause()
+        open_crosstab(driver, timeout); pause()
+        wait_crosstab_sheets(driver)
     ensure_csv_format(driver, timeout)
 
+    done_since_flush = 0
+    io_futures = []
+
+    def _post(path: Path, sheet_name: str, key: str):
+        # normalize + upload + state mark run off the Selenium thread; the
+        # browser can start the next export while these proceed
+        try:
+            normalize_csv_file(path, well_label, wrapped, dash_code, sheet_name)
+        except Exception as e:
+            log(f"      [{dash_code}] note: normalize failed for {path.name}: {e}")
+        ok = s3_copyto_if_new(path, key)
+        if ok: log_s3(f"uploaded -> {key}")
+        else:  log_s3(f"exists -> {key} (skipped)")
+        _mark_sheet_complete_in_memory(st, dash_code, sheet_name, key)
+
     for sheet in incompletes:
         safe = sanitize_name(sheet)
         # select proper sheet
         cur = get_selected_sheet_name(driver)
         if (cur or "").strip() != sheet.strip():
             select_sheet_by_name(driver, sheet)
-            ensure_csv_format(driver, timeout)
+            if not csv_format_selected(driver):
+                ensure_csv_format(driver, timeout)
         # export
         click_dialog_export(driver)
         saved = wait_for_download_and_move(worker_tmp_dir, dash_dir, well_label, sheet, timeout=180)
         if not saved:
             log(f"      [{dash_code}] ✗ timeout: {sheet}")
             continue
-        # normalize CSV if applicable
-        try:
-            normalize_csv_file(saved, well_label, wrapped, dash_code, sheet)
-        except Exception as e:
-            log(f"      [{dash_code}] note: normalize failed for {saved.name}: {e}")
 
-        # upload (never overwrite)
         rel = saved.relative_to(OUT_BASE)
         remote_key = f"Data/{rel.as_posix()}"
-        ok = s3_copyto_if_new(saved, remote_key)
-        if ok: log_s3(f"uploaded -> {remote_key}")
-        else:  log_s3(f"exists -> {remote_key} (skipped)")
+        if io_pool is not None:
+            io_futures.append(io_pool.submit(_post, saved, sheet, remote_key))
+        else:
+            _post(saved, sheet, remote_key)
 
-        # update state immediately
-        state_mark_sheet_complete(well_label, dash_code, sheet, remote_key)
+        # flush state periodically instead of per sheet
+        done_since_flush += 1
+        if done_since_flush >= STATE_FLUSH_EVERY:
+            if io_pool is not None: io_futures.append(io_pool.submit(state_save, st))
+            else: state_save(st)
+            done_since_flush = 0
 
     close_dialog(driver)
-    # finalize dashboard status
+    if io_futures:
+        futures_wait(io_futures)
+        for f in io_futures:
+            exc = f.exception()
+            if exc is not None:
+                # wait() alone swallows these; a failed _post/state_save
+                # would otherwise silently drop completion marks
+                log(f"      [{dash_code}] background task failed: {exc}")
+    # finalize dashboard status (state_save inside persists pending marks)
     state_mark_dashboard_done(well_label, dash_code)
 
 def process_one_well(driver, worker_tmp_dir: Path, out_base: Path, raw_uwi: str,
-                     dashboards: List[str], timeout: int):
+                     dashboards: List[str], timeout: int,
+                     io_pool: Optional[ThreadPoolExecutor] = None):
     raw_uwi = (raw_uwi or "").strip()
     well_label = well_label_from_entry(raw_uwi)
     wrapped = ensure_wrapped(raw_uwi)
@@ -628,6 +948,10 @@ def process_one_well(driver, worker_tmp_dir: Path, out_base: Path, raw_uwi: str,
         log(f"[lock] SKIP (locked): {raw_uwi}")
         return
     hb = start_lock_heartbeat(raw_uwi)
+    # one synchronous tick so the lock expiry is pushed out before any slow
+    # S3 state reads below
+    try: hb.touch()
+    except Exception: pass
     try:
         if can_skip_well_by_state(well_label, dashboards):
             log(f"   -> {raw_uwi} (folder: {well_label})")
@@ -643,29 +967,22 @@ def process_one_well(driver, worker_tmp_dir: Path, out_base: Path, raw_uwi: str,
 
         for code in dashboards:
             try:
-                process_dashboard(driver, worker_tmp_dir, well_root, raw_uwi, well_label, wrapped, code, timeout)
+                process_dashboard(driver, worker_tmp_dir, well_root, raw_uwi, well_label, wrapped, code, timeout, io_pool)
             except Exception as e:
                 log(f"      [{code}] ERROR: {e}")
             pause()
     finally:
+        state_cache_evict(well_label)
         try: hb.stop()
         except Exception: pass
         release_lock(raw_uwi)
 
 # ========= Multiprocessing =========
-def chunkify(seq: List[str], n: int) -> List[List[str]]:
-    n = max(1, n); k, m = divmod(len(seq), n)
-    out = []; start = 0
-    for i in range(n):
-        size = k + (1 if i < m else 0)
-        out.append(seq[start:start+size]); start += size
-    return out
-
 def load_wells(path: str) -> List[str]:
     with open(path, "r", encoding="utf-8") as f:
         return [ln.strip() for ln in f if ln.strip() and not ln.lstrip().startswith("#")]
 
-def worker_main(worker_id: int, wells: List[str], dashboards: List[str],
+def worker_main(worker_id: int, wells_q: Queue, dashboards: List[str],
                 headless: bool, timeout: int, delay: float):
     global DELAY
     DELAY = delay
@@ -677,7 +994,12 @@ def worker_main(worker_id: int, wells: List[str], dashboards: List[str],
         try: driver.quit()
         except Exception: pass
 
+    current_uwi = [None]  # what we hold the lock on, for the signal handler
+
     def _sig_hdlr(sig, frame):
+        if current_uwi[0]:
+            try: release_lock(current_uwi[0])
+            except Exception: pass
         cleanup(); os._exit(1)
 
     for s in (getattr(signal, "SIGINT", None), getattr(signal, "SIGTERM", None)):
@@ -685,18 +1007,34 @@ def worker_main(worker_id: int, wells: List[str], dashboards: List[str],
             try: signal.signal(s, _sig_hdlr)
             except Exception: pass
 
+    # De-prioritize scraper CPU use so heartbeat/lock threads and the
+    # coordinator stay responsive when workers outnumber cores. No CPU
+    # pinning: the browser subprocesses inherit affinity and would be
+    # squeezed onto a single core.
+    try: os.nice(10)
+    except (AttributeError, OSError): pass
+
+    io_pool = ThreadPoolExecutor(max_workers=4)
     try:
         driver = make_driver(tmp_dir, headless=headless)
-        for uwi in wells:
-            process_one_well(driver, tmp_dir, OUT_BASE, uwi, dashboards, timeout)
+        # pull wells from the shared queue: fast workers take more, no worker
+        # idles behind a statically assigned slow chunk
+        while True:
+            try: uwi = wells_q.get(timeout=5)
+            except Empty: break
+            if uwi is None: break  # sentinel
+            current_uwi[0] = uwi
+            process_one_well(driver, tmp_dir, OUT_BASE, uwi, dashboards, timeout, io_pool)
+            current_uwi[0] = None
     finally:
+        io_pool.shutdown(wait=True)
         cleanup()
 
 # ========= CLI =========
 def parse_dashboards_spec(spec: Optional[str]) -> List[str]:
-    if not spec or spec.strip().lower() == "all": return list(DASHBOARDS.keys())
-    wanted = [p.strip() for p in spec.split(",") if p.strip()]
-    return [w for w in wanted if w in DASHBOARDS] or list(DASHBOARDS.keys())
+    if not spec or spec.strip().lower() == "all": return list(DASHBOARDS)
+    wanted = list(filter(_DASHBOARD_KEYS.__contains__, (p.strip() for p in spec.split(","))))
+    return wanted or list(DASHBOARDS)
 
 def main():
     global OUT_BASE
@@ -723,22 +1061,46 @@ def main():
     log(f"[info] OUT_BASE: {OUT_BASE.resolve()}")
     log(f"[info] Headless: {args.headless}, Timeout: {args.timeout}s, Delay: {args.delay}s")
 
-    try: purge_expired_locks()
+    try:
+        purge_expired_locks()
+        start_purge_daemon()  # keep locks/ tidy without blocking acquires
     except Exception: pass
 
-    groups = chunkify(wells, args.workers)
+    nworkers = max(1, min(args.workers, len(wells)))
+    wells_q: Queue = Queue()
+    for u in wells: wells_q.put(u)
+    for _ in range(nworkers): wells_q.put(None)  # one sentinel per worker
+
+    # Persistent workers for the whole run: each builds one driver, then
+    # pulls wells off the shared queue until the sentinel — a fast worker
+    # refills itself instead of idling behind a statically assigned chunk.
     procs: List[Process] = []
-    for wid, group in enumerate(groups, 1):
-        p = Process(target=worker_main, args=(wid, group, dashboards, args.headless, args.timeout, args.delay), daemon=False)
+    for wid in range(1, nworkers + 1):
+        p = Process(target=worker_main, args=(wid, wells_q, dashboards, args.headless, args.timeout, args.delay), daemon=False)
         p.start(); procs.append(p)
 
+    # Bound total wallclock: a wedged driver would otherwise hang join()
+    # forever. Budget scales with the per-worker share of the well list.
+    budget = max(600.0, 3.0 * args.timeout * max(1, len(dashboards)) * (len(wells) / nworkers + 1))
+    deadline = time.time() + budget
     exit_code = 0
     for p in procs:
-        p.join()
+        p.join(timeout=max(1.0, deadline - time.time()))
+        if p.is_alive():
+            log(f"[warn] worker pid={p.pid} exceeded the run budget; terminating")
+            p.terminate(); p.join(timeout=10)
+            exit_code = exit_code or 1
         if p.exitcode not in (0, None): exit_code = p.exitcode
     sys.exit(exit_code)
 
 if __name__ == "__main__":
-    try: set_start_method("spawn")
-    except RuntimeError: pass
+    # forkserver shares the imported interpreter on Linux; spawn elsewhere
+    try:
+        set_start_method("forkserver")
+        # import the heavy modules once in the fork server, not per worker
+        try: set_forkserver_preload(["selenium.webdriver", "s3_merge", "s3_lock"])
+        except Exception: pass
+    except (RuntimeError, ValueError):
+        try: set_start_method("spawn")
+        except RuntimeError: pass
     main()
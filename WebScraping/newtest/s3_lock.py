@@ -1,81 +1,233 @@
 # s3_lock.py
-# Simple S3/rclone locks with TTL + heartbeat + purge.
+# Simple S3 locks with TTL + heartbeat + purge. Uses the shared boto3
+# client from s3_merge when available; rclone subprocesses otherwise.
 
-import json, os, subprocess, time, socket, threading
+import calendar, json, os, re, subprocess, time, socket, threading
 from datetime import datetime, timezone
 from urllib.parse import quote
 
+try:
+    from s3_merge import s3_client, BUCKET
+except Exception:
+    def s3_client(): return None
+    BUCKET = ""
+
+try:
+    import orjson as _fastjson
+except Exception:
+    _fastjson = None
+
 REMOTE = os.environ.get("AER_REMOTE", "aer:aer-scrape-prod")
 LOCK_TTL_SECONDS = int(os.environ.get("AER_LOCK_TTL_SEC", "3600"))
 HEARTBEAT_SEC    = int(os.environ.get("AER_LOCK_HEARTBEAT_SEC", "120"))
 
 def _lsjson_any(path: str):
-    p = subprocess.run(["rclone", "lsjson", f"{REMOTE}/{path}"],
+    c = s3_client()
+    if c is not None:
+        out = []
+        token = None
+        while True:
+            kw = dict(Bucket=BUCKET, Prefix=path, MaxKeys=1000)
+            if path.endswith("/"): kw["Delimiter"] = "/"  # don't walk sub-prefixes
+            if token: kw["ContinuationToken"] = token
+            try: resp = c.list_objects_v2(**kw)
+            except Exception: return out
+            for o in resp.get("Contents", []):
+                rel = o["Key"][len(path):].lstrip("/") or os.path.basename(o["Key"])
+                out.append({"Path": rel, "IsDir": False,
+                            "ModTime": o["LastModified"].isoformat()})
+            if not resp.get("IsTruncated"): break
+            token = resp.get("NextContinuationToken")
+        return out
+    p = subprocess.run(["rclone", "lsjson", "--fast-list", f"{REMOTE}/{path}"],
                        text=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
     if p.returncode != 0: return []
-    try: return json.loads(p.stdout or "[]")
+    try: return (_fastjson or json).loads(p.stdout or "[]")
     except Exception: return []
 
 def _delete(key: str):
+    c = s3_client()
+    if c is not None:
+        try: c.delete_object(Bucket=BUCKET, Key=key)
+        except Exception: pass
+        return
     subprocess.run(["rclone", "deletefile", f"{REMOTE}/{key}"],
                    check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, text=True)
 
+def _epoch(mod_time: str) -> float:
+    """Epoch seconds from a ModTime string. The cheap fixed-width parse is
+    only valid for UTC timestamps — rclone lsjson emits RFC3339 in the
+    machine's LOCAL offset (e.g. ...-06:00), which the slicer would
+    silently misread as UTC and inflate every lock's age by the offset.
+    Anything not explicitly UTC goes through fromisoformat."""
+    try:
+        if mod_time.endswith("Z") or mod_time.endswith("+00:00"):
+            return calendar.timegm((int(mod_time[0:4]), int(mod_time[5:7]), int(mod_time[8:10]),
+                                    int(mod_time[11:13]), int(mod_time[14:16]), int(mod_time[17:19]),
+                                    0, 0, 0))
+    except Exception:
+        pass
+    try: return datetime.fromisoformat(mod_time.replace("Z", "+00:00")).timestamp()
+    except Exception: return time.time()
+
+# Bursty purges within 30s share one listing instead of re-scanning locks/.
+_LOCKS_CACHE = (0.0, [])
+
+def _list_locks():
+    global _LOCKS_CACHE
+    at, arr = _LOCKS_CACHE
+    if (time.time() - at) < 30:
+        return arr
+    arr = _lsjson_any("locks/")
+    _LOCKS_CACHE = (time.time(), arr)
+    return arr
+
 def purge_expired_locks():
-    arr = _lsjson_any("locks")
+    c = s3_client()
     now = time.time()
-    for o in arr:
-        if o.get("IsDir", False): continue
-        name = o.get("Path",""); m = o.get("ModTime","")
-        try: t = datetime.fromisoformat(m.replace("Z","+00:00")).timestamp()
-        except Exception: t = now
-        if (now - t) > LOCK_TTL_SECONDS:
-            _delete(f"locks/{name}")
+    if c is not None:
+        stale = [{"Key": f"locks/{o['Path']}"} for o in _list_locks()
+                 if not o.get("IsDir", False)
+                 and (now - _epoch(o.get("ModTime",""))) > LOCK_TTL_SECONDS]
+        for i in range(0, len(stale), 1000):  # delete_objects batch limit
+            try: c.delete_objects(Bucket=BUCKET,
+                                  Delete={"Objects": stale[i:i+1000], "Quiet": True})
+            except Exception: pass
+        return
+    # Server-side age filter: one rclone process instead of a Python
+    # parse-and-deletefile loop forking per stale entry.
+    p = subprocess.run(["rclone", "delete", f"{REMOTE}/locks/",
+                        f"--min-age={LOCK_TTL_SECONDS}s", "--include", "*.lock"],
+                       check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, text=True)
+    if p.returncode != 0:  # very old rclone: keep the slow loop as backstop
+        for o in _list_locks():
+            if o.get("IsDir", False): continue
+            if (now - _epoch(o.get("ModTime",""))) > LOCK_TTL_SECONDS:
+                _delete(f"locks/{o.get('Path','')}")
+
+# UWIs only ever need '/' and ' ' escaped; translate beats a full quote()
+# pass on every lock op. Anything odd falls back to quote.
+_SAFE_TABLE  = str.maketrans({"/": "%2F", " ": "%20"})
+_NEEDS_QUOTE = re.compile(r"[^A-Za-z0-9._\-/ ]")
 
 def _key(uwi_entry: str) -> str:
-    enc = quote((uwi_entry or "").strip(), safe="")
-    return f"locks/{enc}.lock"
+    u = (uwi_entry or "").strip()
+    if _NEEDS_QUOTE.search(u):
+        return f"locks/{quote(u, safe='')}.lock"
+    return f"locks/{u.translate(_SAFE_TABLE)}.lock"
+
+def _lock_payload() -> str:
+    info = {
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        "started_at": datetime.now(timezone.utc).isoformat()
+    }
+    if _fastjson is not None:
+        return _fastjson.dumps(info, option=_fastjson.OPT_INDENT_2).decode()
+    return json.dumps(info, indent=2)
+
+def start_purge_daemon(interval: float = 0.0):
+    """Purge expired locks periodically from one daemon thread, so
+    acquire_lock never pays the full locks/ scan."""
+    iv = interval or max(60.0, LOCK_TTL_SECONDS / 4)
+    def _loop():
+        while True:
+            time.sleep(iv)
+            try: purge_expired_locks()
+            except Exception: pass
+    t = threading.Thread(target=_loop, daemon=True); t.start()
+    return t
 
 def acquire_lock(uwi: str) -> bool:
-    purge_expired_locks()
     key = _key(uwi)
+    c = s3_client()
+    if c is not None:
+        # Conditional PUT: one round trip, and no list->put window where two
+        # workers can both see "no lock" and both write.
+        body = _lock_payload().encode("utf-8")
+        try:
+            c.put_object(Bucket=BUCKET, Key=key, Body=body, IfNoneMatch="*")
+            return True
+        except Exception as e:
+            code = getattr(e, "response", {}).get("Error", {}).get("Code", "")
+            if code not in ("PreconditionFailed", "ConditionalRequestConflict"):
+                # Anything but "lock already held" (endpoint without
+                # conditional-write support, old botocore rejecting
+                # IfNoneMatch, ...) must be visible: a silent False here
+                # makes every worker skip every well.
+                print(f"[lock] acquire failed for {key}: {e}")
+                return False
+        # Lock exists; take over only if it outlived its TTL.
+        try:
+            head = c.head_object(Bucket=BUCKET, Key=key)
+            age = time.time() - head["LastModified"].timestamp()
+            if age <= LOCK_TTL_SECONDS:
+                return False
+            # Plain delete: DeleteObject with IfMatch only works on
+            # directory buckets and would error here, silently disabling
+            # takeover. The TTL check bounds the race and the conditional
+            # re-PUT below picks exactly one winner.
+            c.delete_object(Bucket=BUCKET, Key=key)
+            c.put_object(Bucket=BUCKET, Key=key, Body=body, IfNoneMatch="*")
+            return True
+        except Exception as e:
+            print(f"[lock] stale-lock takeover failed for {key}: {e}")
+            return False
     arr = _lsjson_any(key)
     now = time.time()
     if arr:
-        try:
-            t = datetime.fromisoformat(arr[0]["ModTime"].replace("Z","+00:00")).timestamp()
-        except Exception:
-            t = now
-        if (now - t) < LOCK_TTL_SECONDS:
+        if (now - _epoch(arr[0].get("ModTime",""))) < LOCK_TTL_SECONDS:
             return False
         _delete(key)  # stale
-    payload = json.dumps({
-        "host": socket.gethostname(),
-        "pid": os.getpid(),
-        "started_at": datetime.now(timezone.utc).isoformat()
-    }, indent=2)
     p = subprocess.run(["rclone", "rcat", f"{REMOTE}/{key}"],
-                       input=payload, text=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                       input=_lock_payload(), text=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     return p.returncode == 0
 
 def release_lock(uwi: str):
     _delete(_key(uwi))
 
+# One scheduler thread heartbeats every registered lock; a thread per held
+# UWI would otherwise accumulate across a worker's run.
+_HB_KEYS: set = set()
+_HB_LOCK = threading.Lock()
+_HB_THREAD = None
+
+def _touch_key(key: str):
+    c = s3_client()
+    if c is not None:
+        try:
+            c.copy_object(Bucket=BUCKET, Key=key,
+                          CopySource={"Bucket": BUCKET, "Key": key},
+                          MetadataDirective="REPLACE")  # refresh LastModified server-side
+        except Exception: pass
+        return
+    try:
+        subprocess.run(["rclone", "touch", f"{REMOTE}/{key}"],
+                       check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, text=True)
+    except Exception: pass
+
+def _hb_loop():
+    while True:
+        time.sleep(HEARTBEAT_SEC)
+        with _HB_LOCK: keys = list(_HB_KEYS)
+        for k in keys:
+            _touch_key(k)
+
 class _HB:
     def __init__(self, uwi: str):
-        self.uwi = uwi
-        self.stop_flag = False
-        self.t = threading.Thread(target=self._loop, daemon=True); self.t.start()
-    def _loop(self):
-        while not self.stop_flag:
-            try:
-                subprocess.run(["rclone", "touch", f"{REMOTE}/{_key(self.uwi)}"],
-                               check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, text=True)
-            except Exception: pass
-            time.sleep(HEARTBEAT_SEC)
+        global _HB_THREAD
+        self.key = _key(uwi)
+        with _HB_LOCK:
+            _HB_KEYS.add(self.key)
+            if _HB_THREAD is None:
+                _HB_THREAD = threading.Thread(target=_hb_loop, daemon=True)
+                _HB_THREAD.start()
+    def touch(self):
+        """One synchronous heartbeat tick; callers may use it to push the
+        lock expiry out before slow work."""
+        _touch_key(self.key)
     def stop(self):
-        self.stop_flag = True
-        try: self.t.join(timeout=2)
-        except Exception: pass
+        with _HB_LOCK: _HB_KEYS.discard(self.key)
 
 def start_lock_heartbeat(uwi: str):
     return _HB(uwi)
@@ -1,46 +1,181 @@
 # s3_merge.py
-# Minimal rclone helpers: read/write text, existence, upload-if-new, list prefix.
+# Minimal S3 helpers: read/write text, existence, upload-if-new, list prefix.
+# Prefers one persistent boto3 client (single TLS session, no per-call
+# fork/exec); falls back to rclone subprocesses when boto3 isn't installed
+# or AER_S3_NATIVE=0.
 
-import json, os, subprocess
+import json, os, subprocess, time, threading
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Set
+
+try:
+    import orjson as _fastjson   # 3-5x faster parse for large listings
+except Exception:
+    _fastjson = None
+
+try:
+    import boto3
+    from botocore.config import Config as _BotoConfig
+    from botocore.exceptions import ClientError, BotoCoreError
+except Exception:
+    boto3 = None
+    ClientError = Exception
+    BotoCoreError = Exception
 
 REMOTE = os.environ.get("AER_REMOTE", "aer:aer-scrape-prod")
+BUCKET = os.environ.get("AER_S3_BUCKET", REMOTE.split(":", 1)[-1])
+
+_S3 = None
+def s3_client():
+    """Shared boto3 client, built once per process; None when unavailable."""
+    global _S3
+    if _S3 is None and boto3 is not None and os.environ.get("AER_S3_NATIVE", "1") != "0":
+        _S3 = boto3.client("s3", config=_BotoConfig(
+            max_pool_connections=64, retries={"max_attempts": 3}))
+    return _S3
 
 def _rcmd(*args, input: Optional[str] = None) -> subprocess.CompletedProcess:
     return subprocess.run(["rclone", *args], text=True, input=input,
                           stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
 
 def s3_lsjson(remote_key: str):
-    p = _rcmd("lsjson", f"{REMOTE}/{remote_key}")
+    # --fast-list: one ListObjects sweep instead of per-directory calls
+    p = _rcmd("lsjson", "--fast-list", f"{REMOTE}/{remote_key}")
     if p.returncode != 0:
         return []
     try:
-        return json.loads(p.stdout or "[]")
+        return (_fastjson or json).loads(p.stdout or "[]")
     except Exception:
         return []
 
+# One LIST per parent prefix answers every membership probe under it for a
+# while, instead of one LIST per s3_exists call in the per-sheet loops.
+_PREFIX_TTL = 60.0
+_PREFIX_CACHE: dict = {}   # prefix -> (expires_at, set of names)
+_PREFIX_LOCK = threading.Lock()
+
+def prefetch_prefix(prefix: str) -> Set[str]:
+    now = time.time()
+    with _PREFIX_LOCK:
+        hit = _PREFIX_CACHE.get(prefix)
+        if hit and hit[0] > now:
+            return hit[1]
+    names = set(s3_list_prefix(prefix))
+    with _PREFIX_LOCK:
+        _PREFIX_CACHE[prefix] = (now + _PREFIX_TTL, names)
+    return names
+
+def _parent_and_name(remote_key: str):
+    return str(Path(remote_key).parent).replace("\\", "/"), Path(remote_key).name
+
+# Memo of recent s3_exists answers: the same not-yet-uploaded keys get
+# probed repeatedly before their first upload. Positives keep longer —
+# nothing deletes objects mid-run.
+_EXISTS_TTL_NEG = 30.0
+_EXISTS_TTL_POS = 300.0
+_EXISTS_CACHE: dict = {}   # key -> (expires_at, bool)
+
+def _exists_remember(remote_key: str, found: bool) -> bool:
+    with _PREFIX_LOCK:
+        if len(_EXISTS_CACHE) > 4096: _EXISTS_CACHE.clear()
+        _EXISTS_CACHE[remote_key] = (
+            time.time() + (_EXISTS_TTL_POS if found else _EXISTS_TTL_NEG), found)
+    return found
+
 def s3_exists(remote_key: str) -> bool:
-    parent = str(Path(remote_key).parent).replace("\\", "/")
-    name   = Path(remote_key).name
-    arr = s3_lsjson(parent)
-    return any((not o.get("IsDir", False)) and (o.get("Path","") == name) for o in arr)
+    # Memoized answer, then warm prefix cache (free set lookup), then a
+    # single O(1) HEAD — never a full parent LIST just to probe one key.
+    now = time.time()
+    parent, name = _parent_and_name(remote_key)
+    with _PREFIX_LOCK:
+        memo = _EXISTS_CACHE.get(remote_key)
+        hit  = _PREFIX_CACHE.get(parent)
+    if memo and memo[0] > now:
+        return memo[1]
+    if hit and hit[0] > now:
+        return _exists_remember(remote_key, name in hit[1])
+    c = s3_client()
+    if c is not None:
+        try:
+            c.head_object(Bucket=BUCKET, Key=remote_key)
+            return _exists_remember(remote_key, True)
+        except (ClientError, BotoCoreError):
+            # BotoCoreError covers network trouble (endpoint/timeout);
+            # degrade to "not found" like the rclone path always has,
+            # rather than letting one outage kill the worker loop.
+            return _exists_remember(remote_key, False)
+    p = _rcmd("lsf", "--files-only", f"{REMOTE}/{remote_key}")
+    return _exists_remember(remote_key, p.returncode == 0 and bool(p.stdout.strip()))
 
 def s3_copyto_if_new(local_file: Path, remote_key: str) -> bool:
-    if s3_exists(remote_key):
-        return False
-    p = _rcmd("copyto", "--ignore-existing", str(local_file), f"{REMOTE}/{remote_key}")
-    return p.returncode == 0
+    parent, name = _parent_and_name(remote_key)
+    with _PREFIX_LOCK:
+        hit = _PREFIX_CACHE.get(parent)
+    if hit and hit[0] > time.time() and name in hit[1]:
+        return False  # known present, no network at all
+    c = s3_client()
+    if c is not None:
+        # Conditional PUT folds the existence check into the upload itself:
+        # one round trip, and PreconditionFailed just means "already there".
+        try:
+            c.put_object(Bucket=BUCKET, Key=remote_key,
+                         Body=Path(local_file).read_bytes(), IfNoneMatch="*")
+            ok = True
+        except Exception as e:
+            code = getattr(e, "response", {}).get("Error", {}).get("Code", "")
+            if code not in ("PreconditionFailed", "ConditionalRequestConflict"):
+                return False
+            ok = False  # skipped: someone else uploaded it first
+    else:
+        # copyto does its own server-side existence check; no separate probe.
+        p = _rcmd("copyto", "--ignore-existing", str(local_file), f"{REMOTE}/{remote_key}")
+        if p.returncode != 0:
+            return False
+        ok = True
+    with _PREFIX_LOCK:
+        hit = _PREFIX_CACHE.get(parent)
+        if hit: hit[1].add(name)  # exists now either way
+    _exists_remember(remote_key, True)
+    return ok
 
 def s3_read_text(remote_key: str) -> Optional[str]:
+    c = s3_client()
+    if c is not None:
+        try:
+            return c.get_object(Bucket=BUCKET, Key=remote_key)["Body"].read().decode("utf-8", "replace")
+        except (ClientError, BotoCoreError):
+            return None
     p = subprocess.run(["rclone", "cat", f"{REMOTE}/{remote_key}"],
                        text=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
     return p.stdout if p.returncode == 0 else None
 
 def s3_put_text(remote_key: str, text: str) -> bool:
+    c = s3_client()
+    if c is not None:
+        try:
+            c.put_object(Bucket=BUCKET, Key=remote_key, Body=(text or "").encode("utf-8"))
+            return True
+        except Exception:
+            return False
     p = _rcmd("rcat", f"{REMOTE}/{remote_key}", input=text or "")
     return p.returncode == 0
 
 def s3_list_prefix(prefix: str) -> List[str]:
+    c = s3_client()
+    if c is not None:
+        pfx = prefix.rstrip("/") + "/"
+        names: List[str] = []
+        token = None
+        while True:
+            kw = dict(Bucket=BUCKET, Prefix=pfx, Delimiter="/", MaxKeys=1000)
+            if token: kw["ContinuationToken"] = token
+            try:
+                resp = c.list_objects_v2(**kw)
+            except Exception:
+                return names
+            names.extend(o["Key"][len(pfx):] for o in resp.get("Contents", []))
+            if not resp.get("IsTruncated"): break
+            token = resp.get("NextContinuationToken")
+        return names
     arr = s3_lsjson(prefix)
     return [o.get("Path","") for o in arr if not o.get("IsDir", False)]
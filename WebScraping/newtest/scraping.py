@@ -1,8 +1,11 @@
 # aer_multi_dash_mp.py
-import os, sys, time, re, shutil, argparse, html, csv
+import os, sys, time, re, shutil, argparse, html, csv, json
 from pathlib import Path
+from uuid import uuid4
+from functools import lru_cache
 from urllib.parse import urlencode
-from multiprocessing import Process, set_start_method
+from multiprocessing import Process, set_start_method, set_forkserver_preload
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait
 from typing import List, Optional, Dict
 
 from selenium import webdriver
@@ -20,6 +23,8 @@ DELAY      = 1.0                  # seconds between actions
 WORKERS    = 2                    # default; override with --workers
 
 # Normalizer behaviour
+BLOCK_ASSETS = True          # block images/fonts/telemetry via CDP
+
 ADD_UWI_FORMATTED = True     # ensure there is exactly one UWI_Formatted
 ADD_UWI_SHORT     = True    # don't append UWI_Short
 ADD_PROVENANCE    = True    # don't append Dashboard/Sheet
@@ -85,7 +90,143 @@ def find_browser_binary():
             return cand
     return None
 
+# --------------- session cache ---------------
+# Cookies survive a worker restart, so the next run resumes the Tableau
+# session instead of paying the multi-second bootstrap per dashboard.
+SESSION_CACHE_TTL = 1800  # keep below Tableau's server-side session timeout
+
+def _session_cache_path(dash_code: str) -> Path:
+    return OUT_BASE / ".session_cache" / f"{dash_code}.json"
+
+def load_session_cache(dash_code: str):
+    try:
+        obj = json.loads(_session_cache_path(dash_code).read_text(encoding="utf-8"))
+        if time.time() - obj.get("ts", 0) < SESSION_CACHE_TTL:
+            return obj.get("cookies") or None
+    except Exception:
+        pass
+    return None
+
+def save_session_cache(dash_code: str, cookies) -> None:
+    p = _session_cache_path(dash_code)
+    try:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({"ts": time.time(), "cookies": cookies}), encoding="utf-8")
+        tmp.replace(p)
+    except Exception:
+        pass
+
+def inject_session_cookies(driver, dash_code: str) -> bool:
+    """Seed cached cookies (one origin visit) before the first viz load."""
+    cookies = load_session_cache(dash_code)
+    if not cookies:
+        return False
+    try:
+        driver.get("https://www2.aer.ca/")
+        now = time.time()
+        for ck in cookies:
+            if ck.get("expiry") and ck["expiry"] <= now:
+                continue
+            try: driver.add_cookie(ck)
+            except Exception: pass
+        return True
+    except Exception:
+        return False
+
+# Sheet lists are a property of the workbook, not the well filter — cache
+# them per dashboard so only the first well pays the thumbnail enumeration.
+SHEETS_CACHE: Dict[str, List[str]] = {}
+
+def _sheets_cache_path() -> Path:
+    return OUT_BASE / ".sheets_cache.json"
+
+def load_sheets_cache() -> None:
+    try:
+        SHEETS_CACHE.update(json.loads(_sheets_cache_path().read_text(encoding="utf-8")))
+    except Exception:
+        pass
+
+def remember_sheets(dash_code: str, sheets: List[str]) -> None:
+    SHEETS_CACHE[dash_code] = sheets
+    try:
+        p = _sheets_cache_path()
+        tmp = p.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(SHEETS_CACHE), encoding="utf-8")
+        tmp.replace(p)  # atomic; last writer wins across workers
+    except Exception:
+        pass
+
+# Resume manifest: one JSONL line per successfully normalized sheet, so a
+# restarted run skips everything it already produced.
+DONE_TRIPLES: set = set()
+
+def _done_manifest_path() -> Path:
+    return OUT_BASE / ".done.jsonl"
+
+def load_done_manifest() -> None:
+    try:
+        with open(_done_manifest_path(), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    o = json.loads(line)
+                    DONE_TRIPLES.add((o["u"], o["d"], o["s"]))
+                except Exception:
+                    continue
+    except OSError:
+        pass
+
+def mark_done(short_uwi: str, dash_code: str, sheet: str) -> None:
+    DONE_TRIPLES.add((short_uwi, dash_code, sheet))
+    try:
+        with open(_done_manifest_path(), "a", encoding="utf-8") as f:
+            try:
+                import fcntl
+                fcntl.flock(f, fcntl.LOCK_EX)  # workers append concurrently
+            except Exception:
+                pass
+            f.write(json.dumps({"u": short_uwi, "d": dash_code, "s": sheet}) + "\n")
+    except Exception:
+        pass
+
 # --------------- selenium helpers ---------------
+# Selector constants (hot paths; built once, serialized to chromedriver a lot)
+DL_ICON_CSS      = "[data-tb-test-id='tb-icons-DownloadBaseIcon']"
+DIALOG_XP        = "//*[@role='dialog']"
+THUMB_XP         = ".//*[starts-with(@data-tb-test-id,'sheet-thumbnail-')]"
+CROSSTAB_MENU_XP = "//*[@data-tb-test-id='download-flyout-TextMenuItem' and .//span[normalize-space()='Crosstab']]"
+EXPORT_BTN_CSS   = "[data-tb-test-id='export-crosstab-export-Button']"
+
+def _dialog(driver, dlg=None):
+    """The open Crosstab dialog; callers holding a live reference pass it to
+    skip one find_element round trip per helper call."""
+    return dlg if dlg is not None else driver.find_element(By.XPATH, DIALOG_XP)
+
+def _block_heavy_assets(driver):
+    """Keep the viz load lean: the export flow never needs images, fonts or
+    the telemetry beacons. CSS is deliberately not blocked — clickability
+    waits depend on rendered layout."""
+    if not BLOCK_ASSETS:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": [
+            "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg",
+            "*.woff", "*.woff2", "*.ttf",
+            "*analytics*", "*telemetry*",
+        ]})
+    except Exception:
+        pass
+
+def _set_download_dir(driver, d: Path):
+    """Point Chrome's downloads at d via CDP (takes effect immediately,
+    unlike the prefs which are fixed at launch)."""
+    try:
+        driver.execute_cdp_cmd("Page.setDownloadBehavior",
+                               {"behavior": "allow", "downloadPath": str(d.resolve())})
+    except Exception:
+        pass
+
 def make_driver(download_dir: Path):
     from selenium.webdriver.chrome.options import Options
     opts = Options()
@@ -102,18 +243,37 @@ def make_driver(download_dir: Path):
         "safebrowsing.enabled": True,
         "profile.default_content_setting_values.automatic_downloads": 1,
     })
+    opts.add_argument("--remote-debugging-port=0")  # for cheap re-attach on recycle
     binpath = find_browser_binary()
     if binpath:
         opts.binary_location = binpath
     # Selenium Manager (>=4.6) resolves the driver automatically
-    return webdriver.Chrome(options=opts)
+    drv = webdriver.Chrome(options=opts)
+    try:
+        drv._aer_debug_addr = drv.capabilities.get("goog:chromeOptions", {}).get("debuggerAddress")
+    except Exception:
+        drv._aer_debug_addr = None
+    _block_heavy_assets(drv)
+    _set_download_dir(drv, download_dir)
+    return drv
+
+def reconnect_driver(addr: str):
+    """Attach a fresh session to an already-running Chrome via its DevTools
+    address — a ~100 ms WebSocket handshake instead of a cold start."""
+    from selenium.webdriver.chrome.options import Options
+    opts = Options()
+    opts.add_experimental_option("debuggerAddress", addr)
+    drv = webdriver.Chrome(options=opts)
+    drv._aer_debug_addr = addr
+    _block_heavy_assets(drv)
+    return drv
 
 def enter_viz_context(driver):
     """Find context (top or single iframe) that contains the toolbar Download icon."""
     driver.switch_to.default_content()
     try:
         WebDriverWait(driver, TIMEOUT).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "[data-tb-test-id='tb-icons-DownloadBaseIcon']"))
+            EC.presence_of_element_located((By.CSS_SELECTOR, DL_ICON_CSS))
         ); return
     except Exception:
         pass
@@ -122,7 +282,7 @@ def enter_viz_context(driver):
             driver.switch_to.default_content()
             driver.switch_to.frame(fr)
             WebDriverWait(driver, int(TIMEOUT/2)).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "[data-tb-test-id='tb-icons-DownloadBaseIcon']"))
+                EC.presence_of_element_located((By.CSS_SELECTOR, DL_ICON_CSS))
             ); return
         except Exception:
             continue
@@ -130,7 +290,7 @@ def enter_viz_context(driver):
 
 def open_download_flyout(driver):
     icon = WebDriverWait(driver, TIMEOUT).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "[data-tb-test-id='tb-icons-DownloadBaseIcon']"))
+        EC.presence_of_element_located((By.CSS_SELECTOR, DL_ICON_CSS))
     )
     driver.execute_script("arguments[0].closest('button').click();", icon)
     pause()
@@ -138,7 +298,7 @@ def open_download_flyout(driver):
 def open_crosstab(driver):
     item = WebDriverWait(driver, TIMEOUT).until(
         EC.element_to_be_clickable((
-            By.XPATH, "//*[@data-tb-test-id='download-flyout-TextMenuItem' and .//span[normalize-space()='Crosstab']]"
+            By.XPATH, CROSSTAB_MENU_XP
         ))
     )
     driver.execute_script("arguments[0].click();", item)
@@ -219,10 +379,41 @@ def click_no_on_reset_dialog(driver, timeout=3) -> bool:
         pass
     return False
 
+def _install_reset_sentinel(driver):
+    """Page-side MutationObserver that flags reset-dialog text into
+    window.__aer_reset_seen, so guard_session_reset is one synchronous
+    execute_script instead of a 2s element poll per call."""
+    try:
+        driver.execute_script("""
+            if (!window.__aer_reset_obs) {
+                window.__aer_reset_seen = false;
+                window.__aer_reset_obs = new MutationObserver(function () {
+                    var t = document.body.innerText || '';
+                    if (t.indexOf('Session Ended by Server') !== -1 ||
+                        t.indexOf('reset the view') !== -1)
+                        window.__aer_reset_seen = true;
+                });
+                window.__aer_reset_obs.observe(document.body,
+                                               {childList: true, subtree: true});
+            }
+        """)
+    except Exception:
+        pass
+
 def guard_session_reset(driver):
     """Call this opportunistically; safe if the dialog isn't present."""
     try:
-        return click_no_on_reset_dialog(driver, timeout=2)
+        seen = driver.execute_script(
+            "if (window.__aer_reset_obs === undefined) return null;"
+            "var s = window.__aer_reset_seen; window.__aer_reset_seen = false;"
+            "return !!s;")
+    except Exception:
+        seen = None
+    if seen is False:
+        return False  # sentinel live and nothing appeared: zero waiting
+    try:
+        # sentinel fired, or isn't installed on this page: real check
+        return click_no_on_reset_dialog(driver, timeout=2 if seen else 1)
     except Exception:
         return False
 
@@ -233,7 +424,7 @@ def crosstab_state(driver) -> str:
       - 'empty'  : dialog shows 'No sheets to select'
       - 'unknown': dialog present but neither condition matched
     """
-    dlg = driver.find_element(By.XPATH, "//*[@role='dialog']")
+    dlg = driver.find_element(By.XPATH, DIALOG_XP)
     # detect empty message
     try:
         dlg.find_element(By.XPATH, ".//*[contains(normalize-space(),'No sheets to select')]")
@@ -241,10 +432,10 @@ def crosstab_state(driver) -> str:
     except Exception:
         pass
     # detect sheets + clickable Download
-    thumbs = dlg.find_elements(By.XPATH, ".//*[starts-with(@data-tb-test-id,'sheet-thumbnail-')]")
+    thumbs = dlg.find_elements(By.XPATH, THUMB_XP)
     if thumbs:
         try:
-            btn = dlg.find_element(By.CSS_SELECTOR, "[data-tb-test-id='export-crosstab-export-Button']")
+            btn = dlg.find_element(By.CSS_SELECTOR, EXPORT_BTN_CSS)
             if btn.is_enabled():
                 return "ready"
         except Exception:
@@ -253,7 +444,7 @@ def crosstab_state(driver) -> str:
 
 def wait_for_crosstab_ready_or_empty(driver, timeout=120) -> str:
     WebDriverWait(driver, timeout).until(
-        EC.presence_of_element_located((By.XPATH, "//*[@role='dialog']"))
+        EC.presence_of_element_located((By.XPATH, DIALOG_XP))
     )
     wait = WebDriverWait(driver, timeout, poll_frequency=0.25)
     def _cond(d):
@@ -272,8 +463,9 @@ def open_crosstab_and_wait_state(driver) -> str:
     pause()
     return state
 
-def ensure_csv_format(driver):
-    dlg = WebDriverWait(driver, TIMEOUT).until(EC.presence_of_element_located((By.XPATH, "//*[@role='dialog']")))
+def ensure_csv_format(driver, dlg=None):
+    if dlg is None:
+        dlg = WebDriverWait(driver, TIMEOUT).until(EC.presence_of_element_located((By.XPATH, DIALOG_XP)))
     for xp in [".//label[@data-tb-test-id='crosstab-options-dialog-radio-csv-Label']",
                ".//label[normalize-space()='CSV']",
                ".//*[normalize-space()='CSV']"]:
@@ -288,9 +480,10 @@ def ensure_csv_format(driver):
     except Exception:
         pass
 
-def list_crosstab_sheets(driver) -> List[str]:
-    dlg = WebDriverWait(driver, TIMEOUT).until(EC.presence_of_element_located((By.XPATH, "//*[@role='dialog']")))
-    thumbs = dlg.find_elements(By.XPATH, ".//*[starts-with(@data-tb-test-id,'sheet-thumbnail-')]")
+def list_crosstab_sheets(driver, dlg=None) -> List[str]:
+    if dlg is None:
+        dlg = WebDriverWait(driver, TIMEOUT).until(EC.presence_of_element_located((By.XPATH, DIALOG_XP)))
+    thumbs = dlg.find_elements(By.XPATH, THUMB_XP)
     names = []
     for t in thumbs:
         title = (t.get_attribute("title") or "").strip()
@@ -303,8 +496,8 @@ def list_crosstab_sheets(driver) -> List[str]:
             names.append(title)
     return names
 
-def get_selected_sheet_name(driver) -> Optional[str]:
-    dlg = driver.find_element(By.XPATH, "//*[@role='dialog']")
+def get_selected_sheet_name(driver, dlg=None) -> Optional[str]:
+    dlg = _dialog(driver, dlg)
     try:
         el = dlg.find_element(By.XPATH, ".//*[@role='option' and @aria-selected='true']")
     except Exception:
@@ -317,18 +510,26 @@ def get_selected_sheet_name(driver) -> Optional[str]:
             name = el.text.strip()
     return name or None
 
-def select_sheet_by_name(driver, sheet_name: str):
-    dlg = driver.find_element(By.XPATH, "//*[@role='dialog']")
+@lru_cache(maxsize=1024)
+def _sheet_xpaths(sheet_name: str):
+    # sheet names repeat across every well; assemble their XPaths once
+    lit = xpath_literal(sheet_name)
+    return (f".//*[@role='option' and @title={lit}]",
+            f".//span[contains(@class,'thumbnail-title') and normalize-space()={lit}]/ancestor::*[@role='option']")
+
+def select_sheet_by_name(driver, sheet_name: str, dlg=None):
+    dlg = _dialog(driver, dlg)
+    by_title, by_thumb = _sheet_xpaths(sheet_name)
     try:
-        el = dlg.find_element(By.XPATH, f".//*[@role='option' and @title={xpath_literal(sheet_name)}]")
+        el = dlg.find_element(By.XPATH, by_title)
     except Exception:
-        el = dlg.find_element(By.XPATH, f".//span[contains(@class,'thumbnail-title') and normalize-space()={xpath_literal(sheet_name)}]/ancestor::*[@role='option']")
+        el = dlg.find_element(By.XPATH, by_thumb)
     driver.execute_script("arguments[0].click();", el); pause()
 
-def click_dialog_export(driver):
-    dlg = driver.find_element(By.XPATH, "//*[@role='dialog']")
+def click_dialog_export(driver, dlg=None):
+    dlg = _dialog(driver, dlg)
     try:
-        btn = dlg.find_element(By.CSS_SELECTOR, "[data-tb-test-id='export-crosstab-export-Button']")
+        btn = dlg.find_element(By.CSS_SELECTOR, EXPORT_BTN_CSS)
         driver.execute_script("arguments[0].click();", btn); return
     except Exception:
         pass
@@ -343,7 +544,7 @@ def click_dialog_export(driver):
 # --- robust download watcher (prevents random suffixes) ---
 VALID_EXTS = {".csv", ".xlsx"}
 
-def _size_stable(p: Path, dwell=0.8) -> bool:
+def _size_stable(p: Path, dwell=0.2) -> bool:
     try:
         s1 = p.stat().st_size
         time.sleep(dwell)
@@ -352,15 +553,22 @@ def _size_stable(p: Path, dwell=0.8) -> bool:
     except FileNotFoundError:
         return False
 
+def _read_head(p: Path, n: int) -> bytes:
+    """First n bytes via raw fd — no BufferedReader setup for a path that
+    runs once per downloaded sheet."""
+    try:
+        fd = os.open(str(p), os.O_RDONLY)
+        try:
+            return os.read(fd, n)
+        finally:
+            os.close(fd)
+    except OSError:
+        return b""
+
 def _guess_ext(p: Path) -> str:
     """Lightweight sniff: .xlsx starts with PK; otherwise assume .csv."""
-    try:
-        with open(p, "rb") as f:
-            head = f.read(4)
-        if head.startswith(b"PK\x03\x04"):
-            return ".xlsx"
-    except Exception:
-        pass
+    if _read_head(p, 4).startswith(b"PK\x03\x04"):
+        return ".xlsx"
     return ".csv"
 
 def wait_for_download_and_move(worker_download_dir: Path,
@@ -376,21 +584,34 @@ def wait_for_download_and_move(worker_download_dir: Path,
     start = time.time()
     deadline = start + timeout
 
-    before_csv = set(p for p in worker_download_dir.glob("*")
-                     if p.suffix.lower() in VALID_EXTS)
+    # An mtime cutoff replaces the old before/after set diff: one scandir
+    # pass per poll (names + cached stat), no set of Paths rebuilt over
+    # every prior download as the worker's dir fills up.
+    cutoff = start - 1.0  # margin for coarse fs timestamp granularity
 
     candidate: Optional[Path] = None
     while time.time() < deadline:
-        now_csv = set(p for p in worker_download_dir.glob("*")
-                      if p.suffix.lower() in VALID_EXTS)
-        new_csv = list(now_csv - before_csv)
-        if new_csv:
-            new_csv.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-            f = new_csv[0]
-            if _size_stable(f):
+        newest = None
+        newest_m = cutoff
+        in_progress = False
+        with os.scandir(worker_download_dir) as it:
+            for e in it:
+                if e.name.endswith(".crdownload"):
+                    in_progress = True
+                    continue
+                if os.path.splitext(e.name)[1].lower() not in VALID_EXTS:
+                    continue
+                m = e.stat().st_mtime
+                if m > newest_m:
+                    newest, newest_m = e, m
+        if newest is not None:
+            f = Path(newest.path)
+            # Chrome renames away the .crdownload marker on completion, so a
+            # final-ext file with no marker left is done — skip the dwell.
+            if not in_progress or _size_stable(f):
                 candidate = f
                 break
-        time.sleep(0.25)
+        time.sleep(0.1)
 
     # Fallback if no final ext yet: pick newest non-temp and sniff
     if candidate is None:
@@ -415,14 +636,21 @@ def wait_for_download_and_move(worker_download_dir: Path,
         target = target_dir / f"{short_uwi}__{safe_sheet}_{cnt}{ext}"
         cnt += 1
 
-    try:
-        shutil.move(str(candidate), str(target))
-    except Exception:
-        shutil.copy2(candidate, target)
-        try: candidate.unlink()
-        except Exception: pass
+    # Atomic same-filesystem rename; the usual failure is Chrome briefly
+    # still holding the handle, which a short retry clears without paying
+    # shutil's full copy.
+    for _ in range(5):
+        try:
+            os.replace(candidate, target)
+            return target
+        except (PermissionError, OSError):
+            time.sleep(0.2)
+    shutil.copy2(candidate, target)
+    try: candidate.unlink()
+    except Exception: pass
     return target
 
+@lru_cache(maxsize=4096)
 def xpath_literal(s):
     if "'" not in s: return f"'{s}'"
     if '"' not in s: return f'"{s}"'
@@ -432,9 +660,21 @@ def xpath_literal(s):
 # ---------- CSV normalization (consistent join keys) ----------
 import csv
 
+try:
+    import pandas as pd   # vectorized normalize when available
+except Exception:
+    pd = None
+
 CANDIDATE_DELIMS = [",", ";", "\t", "|"]
 
 def _detect_delimiter(text: str) -> str:
+    # csv.Sniffer reaches the same answer on a small sample at C speed;
+    # the old modal/variance scan below stays as the fallback for the
+    # degenerate samples Sniffer raises on (single column, blank, ...).
+    try:
+        return csv.Sniffer().sniff(text[:8192], delimiters="".join(CANDIDATE_DELIMS)).delimiter
+    except csv.Error:
+        pass
     lines = [ln for ln in text.splitlines() if ln.strip()][:50]
     if not lines:
         return ","
@@ -451,8 +691,7 @@ def _detect_delimiter(text: str) -> str:
     return best_delim
 
 def _sniff_text_encoding(path: Path) -> str:
-    with open(path, "rb") as fb:
-        head = fb.read(4096)
+    head = _read_head(path, 4096)
     if head.startswith(b"\xff\xfe"): return "utf-16-le"
     if head.startswith(b"\xfe\xff"): return "utf-16-be"
     if head.startswith(b"\xef\xbb\xbf"): return "utf-8-sig"
@@ -462,8 +701,10 @@ def _sniff_text_encoding(path: Path) -> str:
     except Exception:
         return "cp1252"
 
+_NORM_RE = re.compile(r"[^a-z0-9]+")
+
 def _norm_header(h: str) -> str:
-    return re.sub(r"[^a-z0-9]+", "", h.strip().lower())
+    return _NORM_RE.sub("", h.strip().lower())
 
 # liberal recognition of formatted / numeric UWI headers
 BASE_FORMATTED_SYNS = {
@@ -472,26 +713,53 @@ BASE_FORMATTED_SYNS = {
 }
 NUMERIC_UWI_SYNS = {"welluwi", "welluwi.", "welluwi ", "welluwi_", "welluwi-", "welluwi—"}
 
-def _is_formatted_header_key(key: str) -> bool:
-    return key in BASE_FORMATTED_SYNS or ("uwi" in key and "formatted" in key) or key == "wellidentifier"
-
-def _is_numeric_uwi_key(key: str) -> bool:
-    return key in NUMERIC_UWI_SYNS or ("uwi" in key and "formatted" not in key and "identifier" not in key)
-
-def _drop_all_empty_columns(rows: list[list[str]]) -> list[list[str]]:
-    """Remove columns where every data cell (excluding header) is empty."""
-    if not rows:
-        return rows
-    cols = list(zip(*rows))
-    keep_idx = []
-    for i, col in enumerate(cols):
-        data_cells = col[1:]
-        if any((c or "").strip() for c in data_cells):
-            keep_idx.append(i)
-    new_rows = []
-    for r in rows:
-        new_rows.append([r[i] for i in keep_idx])
-    return new_rows
+@lru_cache(maxsize=1024)
+def classify_header(h: str) -> str:
+    """'formatted' / 'numeric' / 'other' for a raw header cell. Memoized:
+    the same dashboard headers recur across every well's sheets."""
+    key = _norm_header(h)
+    if key in BASE_FORMATTED_SYNS or ("uwi" in key and "formatted" in key):
+        return "formatted"
+    if key in NUMERIC_UWI_SYNS or ("uwi" in key and "identifier" not in key):
+        return "numeric"
+    return "other"
+
+def _normalize_csv_pandas(path: Path, short_uwi: str, wrapped_uwi: str,
+                          dashboard: str, sheet: str, enc: str, delim: str) -> None:
+    """Same transform as the pure-python path below, but vectorized: one
+    C-speed parse and column-wise ops instead of per-row Python loops."""
+    df = pd.read_csv(path, sep=delim, encoding=enc, dtype=str,
+                     keep_default_na=False, na_filter=False)
+    rename = {}
+    saw_formatted = False
+    for c in df.columns:
+        kind = classify_header(str(c))
+        if kind == "formatted":
+            rename[c] = "UWI_Formatted"; saw_formatted = True
+        elif kind == "numeric":
+            rename[c] = "UWI_Numeric"
+        else:
+            rename[c] = str(c).strip()
+    df.rename(columns=rename, inplace=True)
+
+    if ADD_UWI_FORMATTED:
+        if not saw_formatted:
+            df["UWI_Formatted"] = wrapped_uwi
+        else:
+            col = df["UWI_Formatted"]
+            if getattr(col, "ndim", 1) == 1:  # skip fill on duplicate headers
+                df.loc[col.str.strip() == "", "UWI_Formatted"] = wrapped_uwi
+    if ADD_UWI_SHORT and "UWI_Short" not in df.columns:
+        df["UWI_Short"] = short_uwi
+    if ADD_PROVENANCE:
+        if "Dashboard" not in df.columns: df["Dashboard"] = dashboard
+        if "Sheet" not in df.columns: df["Sheet"] = sheet
+    if STRIP_EMPTY_TRAILING_COLS and len(df):
+        df = df.loc[:, (df != "").any(axis=0)]
+
+    tmp = path.with_suffix(".csv.tmp")
+    df.to_csv(tmp, sep=delim, encoding="utf-8-sig", index=False)
+    tmp.replace(path)
 
 def normalize_csv_file(path: Path, short_uwi: str, wrapped_uwi: str,
                        dashboard: str, sheet: str) -> None:
@@ -504,81 +772,120 @@ def normalize_csv_file(path: Path, short_uwi: str, wrapped_uwi: str,
         return
 
     enc = _sniff_text_encoding(path)
-    raw = path.read_text(encoding=enc, errors="replace")
-    delim = _detect_delimiter(raw)
-
-    # parse with detected delimiter
-    parsed: list[list[str]] = [next(csv.reader([ln], delimiter=delim)) for ln in raw.splitlines()]
-    if not parsed:
-        return
 
-    header = [h.strip() for h in parsed[0]]
-    data   = parsed[1:]
+    if pd is not None:
+        # delimiter from an 8 KB prefix; pandas never needs the full text in Python
+        with open(path, "r", encoding=enc, errors="replace") as f:
+            delim = _detect_delimiter(f.read(8192))
+        try:
+            _normalize_csv_pandas(path, short_uwi, wrapped_uwi, dashboard, sheet, enc, delim)
+            return
+        except Exception:
+            pass  # odd file; fall through to the tolerant pure-python path
+
+    # ---- pure-python path: two streaming passes, O(one row) memory ----
+    # Pass 1 feeds the file handle to a single csv.reader (no splitlines
+    # list, no per-line reader objects) and only records which columns
+    # hold any data.
+    with open(path, "r", encoding=enc, errors="replace", newline="") as fin:
+        peek = fin.read(8192)
+        delim = _detect_delimiter(peek)
+        fin.seek(0)
+        r = csv.reader(fin, delimiter=delim)
+        header = next(r, None)
+        if header is None:
+            return
+        width = len(header)
+        nonempty = bytearray(width)
+        for row in r:
+            if len(row) > width:
+                nonempty.extend(b"\x00" * (len(row) - width)); width = len(row)
+            for i, cell in enumerate(row):
+                if not nonempty[i] and cell.strip():
+                    nonempty[i] = 1
 
     # rename header synonyms (don’t add extras here)
-    mapped = []
-    seen_formatted_idx = None
+    header = [h.strip() for h in header] + [""] * (width - len(header))
+    mapped, seen_formatted_idx = [], None
     for i, h in enumerate(header):
-        key = _norm_header(h)
-        if _is_formatted_header_key(key):
+        kind = classify_header(h)
+        if kind == "formatted":
             mapped.append("UWI_Formatted")
             seen_formatted_idx = i
-        elif _is_numeric_uwi_key(key):
+        elif kind == "numeric":
             mapped.append("UWI_Numeric")
         else:
             mapped.append(h)
 
-    header = mapped
-
-    # optionally ensure exactly one UWI_Formatted column
-    if ADD_UWI_FORMATTED:
-        if seen_formatted_idx is None:
-            header.append("UWI_Formatted")
-            for r in data:
-                r.append(wrapped_uwi)
-        else:
-            # if present but empty, fill empties with wrapped_uwi
-            for r in data:
-                if seen_formatted_idx < len(r):
-                    if not (r[seen_formatted_idx] or "").strip():
-                        r[seen_formatted_idx] = wrapped_uwi
-
-    # (intentionally NOT adding UWI_Short / Dashboard / Sheet unless you set flags)
-    if ADD_UWI_SHORT:
-        if "UWI_Short" not in header:
-            header.append("UWI_Short")
-            for r in data: r.append(short_uwi)
+    # constant columns appended to every row
+    extra: list = []
+    if ADD_UWI_FORMATTED and seen_formatted_idx is None:
+        extra.append(("UWI_Formatted", wrapped_uwi))
+    if ADD_UWI_SHORT and "UWI_Short" not in mapped:
+        extra.append(("UWI_Short", short_uwi))
     if ADD_PROVENANCE:
-        if "Dashboard" not in header:
-            header.append("Dashboard")
-            for r in data: r.append(dashboard)
-        if "Sheet" not in header:
-            header.append("Sheet")
-            for r in data: r.append(sheet)
-
-    out_rows = [header] + data
-
-    # drop columns that are entirely empty (lots of Tableau sheets have a trailing empty field)
-    if STRIP_EMPTY_TRAILING_COLS:
-        out_rows = _drop_all_empty_columns(out_rows)
-
-    # write back as UTF-8 with BOM (Excel-friendly) using same delimiter
+        if "Dashboard" not in mapped: extra.append(("Dashboard", dashboard))
+        if "Sheet" not in mapped: extra.append(("Sheet", sheet))
+
+    # drop columns that are entirely empty (lots of Tableau sheets have a trailing empty field);
+    # an all-blank UWI_Formatted column gets back-filled below, so keep it
+    if ADD_UWI_FORMATTED and seen_formatted_idx is not None:
+        nonempty[seen_formatted_idx] = 1
+    keep = [i for i in range(width) if nonempty[i]] if STRIP_EMPTY_TRAILING_COLS else list(range(width))
+    out_header = [mapped[i] for i in keep] + [n for n, _ in extra]
+    extra_vals = [v for _, v in extra]
+    fi = seen_formatted_idx if ADD_UWI_FORMATTED else None
+
+    # Pass 2: transform row by row straight into the UTF-8 BOM rewrite.
     tmp = path.with_suffix(".csv.tmp")
-    with open(tmp, "w", encoding="utf-8-sig", newline="") as f:
-        w = csv.writer(f, delimiter=delim, quoting=csv.QUOTE_MINIMAL)
-        w.writerows(out_rows)
+    with open(path, "r", encoding=enc, errors="replace", newline="") as fin, \
+         open(tmp, "w", encoding="utf-8-sig", newline="") as fout:
+        r = csv.reader(fin, delimiter=delim)
+        w = csv.writer(fout, delimiter=delim, quoting=csv.QUOTE_MINIMAL)
+        next(r, None)
+        w.writerow(out_header)
+        for row in r:
+            if len(row) < width:
+                row = row + [""] * (width - len(row))
+            if fi is not None and not (row[fi] or "").strip():
+                row[fi] = wrapped_uwi
+            w.writerow([row[i] for i in keep] + extra_vals)
     tmp.replace(path)
 
 
 # --------------- per-well & per-dashboard ---------------
-def process_one_dashboard(driver, worker_tmp_dir: Path, well_root: Path, short_uwi: str, dash_code: str, dash_base: str):
+def _post_download(saved: Path, short_uwi: str, dash_code: str, sheet: str):
+    try:
+        normalize_csv_file(saved, short_uwi, wrap_uwi(short_uwi), dash_code, sheet)
+        mark_done(short_uwi, dash_code, sheet)
+    except Exception as e:
+        print(f"      [{dash_code}] note: normalize failed on {saved.name}: {e}")
+
+def process_one_dashboard(driver, worker_tmp_dir: Path, well_root: Path, short_uwi: str, dash_code: str, dash_base: str,
+                          io_pool: Optional[ThreadPoolExecutor] = None):
     dash_dir = well_root / dash_code
     dash_dir.mkdir(parents=True, exist_ok=True)
 
-    # Open dashboard
+    # Open dashboard (cookies seeded once per driver; domain-wide)
+    if not getattr(driver, "_aer_session_seeded", False):
+        inject_session_cookies(driver, dash_code)
+        driver._aer_session_seeded = True
     driver.get(url_for(dash_base, short_uwi)); pause()
+    _install_reset_sentinel(driver)
     guard_session_reset(driver)
-    enter_viz_context(driver); pause()
+    try:
+        enter_viz_context(driver); pause()
+    except RuntimeError:
+        # stale resumed session? drop the cache and reload once clean
+        try: _session_cache_path(dash_code).unlink()
+        except Exception: pass
+        driver.delete_all_cookies()
+        driver.get(url_for(dash_base, short_uwi)); pause()
+        _install_reset_sentinel(driver)
+        guard_session_reset(driver)
+        enter_viz_context(driver); pause()
+    try: save_session_cache(dash_code, driver.get_cookies())
+    except Exception: pass
 
     # Open dialog and determine if there are sheets
     state = open_crosstab_and_wait_state(driver)
@@ -588,15 +895,28 @@ def process_one_dashboard(driver, worker_tmp_dir: Path, well_root: Path, short_u
         close_dialog(driver)
         return
 
-    # state == 'ready'
-    ensure_csv_format(driver)
-    sheets = list_crosstab_sheets(driver)
+    # state == 'ready' — fetch the dialog once and hand it to the helpers
+    dlg = _dialog(driver)
+    ensure_csv_format(driver, dlg)
+    sheets = SHEETS_CACHE.get(dash_code)
+    if not sheets:
+        sheets = list_crosstab_sheets(driver, dlg)
+        if sheets:
+            remember_sheets(dash_code, sheets)
     (dash_dir / "sheets.txt").write_text("\n".join(sheets), encoding="utf-8")
     print(f"      [{dash_code}] sheets: {sheets}")
     pause()
 
     # Download each sheet (re-open dialog each time to avoid drift)
+    io_futures: list = []
     for sheet in sheets:
+        # resume: skip sheets already normalized on a previous run (the
+        # output check guards manifest lines whose file was deleted)
+        if (short_uwi, dash_code, sheet) in DONE_TRIPLES:
+            out = dash_dir / f"{short_uwi}__{sanitize_name(sheet)}.csv"
+            if out.exists() and out.stat().st_size > 0:
+                print(f"      [{dash_code}] = {sheet} already done — skipping")
+                continue
         try:
             state = open_crosstab_and_wait_state(driver)
         except TimeoutException:
@@ -608,28 +928,42 @@ def process_one_dashboard(driver, worker_tmp_dir: Path, well_root: Path, short_u
             close_dialog(driver)
             break
 
-        ensure_csv_format(driver)
+        dlg = _dialog(driver)  # fresh reference per dialog open
+        ensure_csv_format(driver, dlg)
 
         # avoid toggling off the preselected first tile
-        current = get_selected_sheet_name(driver)
+        current = get_selected_sheet_name(driver, dlg)
         if norm(current) != norm(sheet):
-            select_sheet_by_name(driver, sheet)
+            select_sheet_by_name(driver, sheet, dlg)
 
-        ensure_csv_format(driver)
-        click_dialog_export(driver)
+        ensure_csv_format(driver, dlg)
 
-        saved = wait_for_download_and_move(worker_tmp_dir, dash_dir, short_uwi, sheet, timeout=180)
+        # Fresh empty subdir per export: the downloaded file is the only
+        # file there, so the watcher never diffs against earlier downloads
+        # and concurrent sheets can't be confused for each other.
+        sheet_dl = worker_tmp_dir / f"s_{uuid4().hex}"
+        sheet_dl.mkdir()
+        _set_download_dir(driver, sheet_dl)
+        click_dialog_export(driver, dlg)
+
+        saved = wait_for_download_and_move(sheet_dl, dash_dir, short_uwi, sheet, timeout=180)
+        shutil.rmtree(sheet_dl, ignore_errors=True)
         if saved:
-            try:
-                normalize_csv_file(saved, short_uwi, wrap_uwi(short_uwi), dash_code, sheet)
-            except Exception as e:
-                print(f"      [{dash_code}] note: normalize failed on {saved.name}: {e}")
+            # normalize off-thread so the driver can start the next sheet
+            if io_pool is not None:
+                io_futures.append(io_pool.submit(_post_download, saved, short_uwi, dash_code, sheet))
+            else:
+                _post_download(saved, short_uwi, dash_code, sheet)
             print(f"      [{dash_code}] ✓ {sheet} -> {saved.name}")
         else:
             print(f"      [{dash_code}] ✗ {sheet} -> download timed out")
         pause()
 
-def process_one_well(driver, worker_tmp_dir: Path, out_base: Path, raw_uwi: str):
+    if io_futures:
+        futures_wait(io_futures)
+
+def process_one_well(driver, worker_tmp_dir: Path, out_base: Path, raw_uwi: str,
+                     io_pool: Optional[ThreadPoolExecutor] = None):
     short_uwi = to_short_uwi(raw_uwi)
     well_root = out_base / sanitize_name(short_uwi)
     well_root.mkdir(parents=True, exist_ok=True)
@@ -637,7 +971,7 @@ def process_one_well(driver, worker_tmp_dir: Path, out_base: Path, raw_uwi: str)
 
     for code, base in DASHBOARDS.items():
         try:
-            process_one_dashboard(driver, worker_tmp_dir, well_root, short_uwi, code, base)
+            process_one_dashboard(driver, worker_tmp_dir, well_root, short_uwi, code, base, io_pool)
         except Exception as e:
             print(f"      [{code}] ERROR: {e}")
         pause()
@@ -646,28 +980,40 @@ def process_one_well(driver, worker_tmp_dir: Path, out_base: Path, raw_uwi: str)
 def worker_main(worker_id: int, wells: List[str]):
     tmp_dir = OUT_BASE / f"_tmp_worker_{worker_id}"
     tmp_dir.mkdir(parents=True, exist_ok=True)
+    load_sheets_cache()
+    load_done_manifest()
 
     driver = None
+    io_pool = ThreadPoolExecutor(max_workers=2)  # off-thread normalize
     try:
         driver = make_driver(tmp_dir)
         for idx, uwi in enumerate(wells, 1):
             print(f"[worker {worker_id}] ({idx}/{len(wells)}) {uwi}")
             try:
-                process_one_well(driver, tmp_dir, OUT_BASE, uwi)
+                process_one_well(driver, tmp_dir, OUT_BASE, uwi, io_pool)
             except Exception as e:
                 print(f"[worker {worker_id}] ERROR on {uwi}: {e}")
-                # recycle driver & retry once
-                try:
-                    driver.quit()
-                except Exception:
-                    pass
-                driver = make_driver(tmp_dir)
+                # recycle driver & retry once; prefer re-attaching to the
+                # still-running Chrome over a full cold start
+                new_drv = None
+                addr = getattr(driver, "_aer_debug_addr", None)
+                if addr:
+                    try: new_drv = reconnect_driver(addr)
+                    except Exception: new_drv = None
+                if new_drv is None:
+                    try:
+                        driver.quit()
+                    except Exception:
+                        pass
+                    new_drv = make_driver(tmp_dir)
+                driver = new_drv
                 try:
-                    process_one_well(driver, tmp_dir, OUT_BASE, uwi)
+                    process_one_well(driver, tmp_dir, OUT_BASE, uwi, io_pool)
                 except Exception as e2:
                     print(f"[worker {worker_id}] RETRY failed on {uwi}: {e2}")
             pause()
     finally:
+        io_pool.shutdown(wait=True)
         try:
             if driver: driver.quit()
         except Exception:
@@ -715,8 +1061,13 @@ def main():
     sys.exit(exit_code)
 
 if __name__ == "__main__":
+    # forkserver shares the imported interpreter on Linux; spawn elsewhere
     try:
-        set_start_method("spawn")
-    except RuntimeError:
-        pass
+        set_start_method("forkserver")
+        # import selenium once in the fork server, not per worker
+        try: set_forkserver_preload(["selenium.webdriver"])
+        except Exception: pass
+    except (RuntimeError, ValueError):
+        try: set_start_method("spawn")
+        except RuntimeError: pass
     main()
@@ -1,8 +1,12 @@
 # aer_multi_dash_mp.py
 import os, sys, time, re, shutil, argparse, html, csv, platform
+import logging, logging.handlers
+from collections import Counter
+from functools import lru_cache
 from pathlib import Path
-from urllib.parse import urlencode
+from urllib.parse import urlencode, quote_plus
 from multiprocessing import Process, set_start_method
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait
 from typing import List, Optional, Dict, Tuple
 
 from selenium import webdriver
@@ -24,6 +28,7 @@ ADD_UWI_FORMATTED = True
 ADD_UWI_SHORT     = True
 ADD_PROVENANCE    = True
 STRIP_EMPTY_TRAILING_COLS = True
+FAST_SKIP_NORMALIZED = True   # skip rewrite when BOM+columns show it's done
 
 # ==========================================
 # Dashboards to scrape (folder name -> base view URL)
@@ -50,25 +55,48 @@ IMPORTANT_SHEET_KEYWORDS = [
 ]
 
 # ----------------- small utils -----------------
+# Buffered logging: workers emit many short lines and a line-buffered
+# stdout pays one write() syscall (plus stderr lock contention across
+# processes) per line. MemoryHandler batches ~256 records per flush;
+# warnings and errors still flush immediately, and logging.shutdown()
+# drains the buffer at exit.
+_log_target = logging.StreamHandler()
+_log_target.setFormatter(logging.Formatter("%(message)s"))
+_log_buffer = logging.handlers.MemoryHandler(capacity=256, flushLevel=logging.WARNING,
+                                             target=_log_target)
+logger = logging.getLogger("scrape")
+logger.setLevel(logging.INFO)
+logger.addHandler(_log_buffer)
+
+def log(msg: str): logger.info(msg)
+
 def pause(): time.sleep(DELAY)
 
+# Patterns compiled once; these run per header cell / sheet name, and the
+# bound-method call skips re's per-call cache probe.
+_SANITIZE_RE   = re.compile(r"[^A-Za-z0-9_.-]+")
+_WS_RE         = re.compile(r"\s+")
+_NONALNUM_RE   = re.compile(r"[^a-z0-9]+")
+_SPLIT_KEYS_RE = re.compile(r"[,\|]")
+
 def sanitize_name(s: str) -> str:
-    return re.sub(r"[^A-Za-z0-9_.-]+", "_", (s or "").strip())
+    return _SANITIZE_RE.sub("_", (s or "").strip())
 
 def norm(s: Optional[str]) -> str:
     if s is None: return ""
     s = html.unescape(s)
-    return re.sub(r"\s+", " ", s.strip())
+    return _WS_RE.sub(" ", s.strip())
 
 def _norm(s: Optional[str]) -> str:
-    return "" if s is None else re.sub(r"\s+", "", s.strip().lower())
+    return "" if s is None else _WS_RE.sub("", s.strip().lower())
 
 def _norm_name(s: str) -> str:
-    return re.sub(r"[^a-z0-9]+", "", (s or "").lower())
+    return _NONALNUM_RE.sub("", (s or "").lower())
 
 def is_wrapped_uwi(txt: str) -> bool:
     return txt.startswith("00/") and txt.endswith("/0")
 
+@lru_cache(maxsize=4096)
 def to_short_uwi(uwi: str) -> str:
     """Return short UWI like '01-01-013-16W4' whether input is short or '00/.../0'."""
     u = uwi.strip()
@@ -76,18 +104,27 @@ def to_short_uwi(uwi: str) -> str:
         u = u[3:-2]  # strip '00/' and '/0'
     return u
 
+@lru_cache(maxsize=4096)
 def wrap_uwi(uwi: str) -> str:
     """Return Tableau-required wrapped UWI '00/<short>/0' for URL queries."""
     short = to_short_uwi(uwi)
     return f"00/{short}/0"
 
+# Everything except the UWI value is constant per dashboard; build each
+# prefix once instead of urlencoding a fresh 3-key dict per navigation.
+_URL_PREFIX: Dict[str, str] = {
+    base: base + "?" + urlencode({":showVizHome": "no", ":toolbar": "yes"})
+          + "&" + quote_plus("Enter Well Identifier (UWI)") + "="
+    for base in DASHBOARDS.values()
+}
+
 def url_for(dash_base: str, uwi: str) -> str:
-    qs = urlencode({
-        ":showVizHome": "no",
-        ":toolbar": "yes",
-        "Enter Well Identifier (UWI)": wrap_uwi(uwi),
-    })
-    return f"{dash_base}?{qs}"
+    prefix = _URL_PREFIX.get(dash_base)
+    if prefix is None:  # ad-hoc base: build and remember
+        prefix = (dash_base + "?" + urlencode({":showVizHome": "no", ":toolbar": "yes"})
+                  + "&" + quote_plus("Enter Well Identifier (UWI)") + "=")
+        _URL_PREFIX[dash_base] = prefix
+    return prefix + quote_plus(wrap_uwi(uwi))
 
 def parse_dashboards_spec(spec: Optional[str]) -> List[str]:
     """
@@ -104,7 +141,7 @@ def parse_dashboards_spec(spec: Optional[str]) -> List[str]:
         if w in DASHBOARDS:
             out.append(w)
         else:
-            print(f"[warn] Unknown dashboard '{w}' (valid: {list(DASHBOARDS.keys())})")
+            log(f"[warn] Unknown dashboard '{w}' (valid: {list(DASHBOARDS.keys())})")
     return out or list(DASHBOARDS.keys())
 
 def parse_sheets_spec(spec: Optional[str]) -> Optional[Dict[str, List[str]]]:
@@ -131,23 +168,48 @@ def parse_sheets_spec(spec: Optional[str]) -> Optional[Dict[str, List[str]]]:
                 continue
             dash, items = p.split(":", 1)
             dash = dash.strip()
-            keys = [k.strip() for k in re.split(r"[,\|]", items) if k.strip()]
+            keys = [k.strip() for k in _SPLIT_KEYS_RE.split(items) if k.strip()]
             out[dash] = keys
         return out if out else None
 
     keys = [k.strip() for k in spec.split(",") if k.strip()]
     return {code: keys for code in DASHBOARDS.keys()}
 
-def should_keep_sheet(sheet_name: str, allow_list: Optional[List[str]]) -> bool:
-    """Return True if this sheet should be downloaded under the allow_list."""
+def _prepare_allow(allow_list: Optional[List[str]]) -> Optional[List[str]]:
+    """Normalize the allow-list once; should_keep_sheet was re-normalizing
+    every keyword for every sheet of every well."""
     if allow_list is None:
+        return None
+    return [k for k in (_norm_name(key) for key in allow_list) if k]
+
+def should_keep_sheet(sheet_name: str, norm_allow: Optional[List[str]]) -> bool:
+    """Return True if this sheet should be downloaded. norm_allow comes
+    from _prepare_allow (keywords already normalized)."""
+    if norm_allow is None:
         return True
     s_norm = _norm_name(sheet_name)
-    for key in allow_list:
-        k_norm = _norm_name(key)
-        if k_norm and (k_norm in s_norm or s_norm in k_norm):
-            return True
-    return False
+    return any(k in s_norm or s_norm in k for k in norm_allow)
+
+def _atomic_write_text(p: Path, text: str) -> None:
+    """Write a small manifest in three syscalls (open/write/close) plus an
+    atomic rename — none of pathlib's layered file-object setup."""
+    tmp = str(p) + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, text.encode("utf-8"))
+    finally:
+        os.close(fd)
+    os.replace(tmp, str(p))
+
+def _index_dash_dir(dash_dir: Path) -> set:
+    """All filenames under a dashboard dir from one scandir pass; one
+    listing replaces two exists() stats per sheet (slow on OneDrive/
+    network mounts)."""
+    try:
+        with os.scandir(dash_dir) as it:
+            return {e.name for e in it}
+    except OSError:
+        return set()
 
 def compute_missing_sheets_for_dashboard(
     well_root: Path,
@@ -183,20 +245,22 @@ def compute_missing_sheets_for_dashboard(
         return ([], [])
 
     # Filter by allow_sheets (keywords/exact), mirroring runtime behavior
-    kept = [s for s in all_sheets if should_keep_sheet(s, allow_sheets)]
+    norm_allow = _prepare_allow(allow_sheets)
+    kept = [s for s in all_sheets if should_keep_sheet(s, norm_allow)]
 
+    index = _index_dash_dir(dash_dir)
     missing = []
     for sheet in kept:
         safe_sheet = sanitize_name(sheet)
-        csv_path  = dash_dir / f"{short_uwi}__{safe_sheet}.csv"
-        xlsx_path = dash_dir / f"{short_uwi}__{safe_sheet}.xlsx"
-        if not (csv_path.exists() or xlsx_path.exists()):
+        if not (f"{short_uwi}__{safe_sheet}.csv" in index
+                or f"{short_uwi}__{safe_sheet}.xlsx" in index):
             missing.append(sheet)
 
     return (all_sheets, missing)
 
 
 # --------------- selenium helpers ---------------
+@lru_cache(maxsize=None)
 def find_browser_binary():
     system = platform.system().lower()
     candidates = []
@@ -225,6 +289,15 @@ def find_browser_binary():
             return cand
     return None
 
+def _enable_http_cache(drv):
+    """Make sure the browser HTTP cache stays on: the Tableau JS bundle is
+    identical across wells of the same dashboard and re-fetching it is the
+    bulk of each navigation."""
+    try:
+        drv.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": False})
+    except Exception:
+        pass
+
 def make_driver(download_dir: Path):
     system = platform.system().lower()
     try:
@@ -247,7 +320,9 @@ def make_driver(download_dir: Path):
         binpath = find_browser_binary()
         if binpath and os.path.basename(binpath).lower().startswith(("chrome", "chromium")):
             opts.binary_location = binpath
-        return webdriver.Chrome(options=opts)
+        drv = webdriver.Chrome(options=opts)
+        _enable_http_cache(drv)
+        return drv
     except Exception as chrome_err:
         try:
             from selenium.webdriver.edge.options import Options as EdgeOptions
@@ -265,7 +340,9 @@ def make_driver(download_dir: Path):
             binpath = find_browser_binary()
             if binpath and os.path.basename(binpath).lower().startswith("msedge"):
                 opts.binary_location = binpath
-            return webdriver.Edge(options=opts)
+            drv = webdriver.Edge(options=opts)
+            _enable_http_cache(drv)
+            return drv
         except Exception as edge_err:
             raise RuntimeError(
                 f"Could not start Chrome or Edge WebDriver on {system}.\n"
@@ -432,6 +509,7 @@ def list_crosstab_sheets(driver) -> List[str]:
     dlg = WebDriverWait(driver, TIMEOUT).until(EC.presence_of_element_located((By.XPATH, "//*[@role='dialog']")))
     thumbs = dlg.find_elements(By.XPATH, ".//*[starts-with(@data-tb-test-id,'sheet-thumbnail-')]")
     names = []
+    seen = set()  # O(1) dedup; `title not in names` rescanned the list
     for t in thumbs:
         title = (t.get_attribute("title") or "").strip()
         if not title:
@@ -439,7 +517,8 @@ def list_crosstab_sheets(driver) -> List[str]:
                 title = t.find_element(By.XPATH, ".//span[contains(@class,'thumbnail-title')]").text.strip()
             except Exception:
                 title = t.text.strip()
-        if title and title not in names:
+        if title and title not in seen:
+            seen.add(title)
             names.append(title)
     return names
 
@@ -510,17 +589,26 @@ def wait_for_download_and_move(worker_download_dir: Path,
     start = time.time()
     deadline = start + timeout
 
-    before_csv = set(p for p in worker_download_dir.glob("*")
-                     if p.suffix.lower() in VALID_EXTS)
+    # An mtime cutoff replaces the before/after glob set diff: one scandir
+    # pass per poll, no set of Paths rebuilt over every file already
+    # accumulated in the worker dir.
+    cutoff = start - 1.0  # margin for coarse fs timestamp granularity
 
     candidate: Optional[Path] = None
     while time.time() < deadline:
-        now_csv = set(p for p in worker_download_dir.glob("*")
-                      if p.suffix.lower() in VALID_EXTS)
-        new_csv = list(now_csv - before_csv)
-        if new_csv:
-            new_csv.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-            f = new_csv[0]
+        newest = None
+        newest_m = cutoff
+        with os.scandir(worker_download_dir) as it:
+            for e in it:
+                if e.name.endswith(".crdownload"):
+                    continue
+                if os.path.splitext(e.name)[1].lower() not in VALID_EXTS:
+                    continue
+                m = e.stat().st_mtime
+                if m > newest_m:
+                    newest, newest_m = e, m
+        if newest is not None:
+            f = Path(newest.path)
             if _size_stable(f):
                 candidate = f
                 break
@@ -556,44 +644,57 @@ def wait_for_download_and_move(worker_download_dir: Path,
         except Exception: pass
     return target
 
+@lru_cache(maxsize=2048)
 def xpath_literal(s):
+    # sheet names repeat across every well; escape each distinct one once
     if "'" not in s: return f"'{s}'"
     if '"' not in s: return f'"{s}"'
     parts = s.split("'")
     return "concat(" + ", \"'\", ".join([f"'{p}'" for p in parts]) + ")"
 
 # ---------- CSV normalization ----------
+try:
+    import pyarrow as pa            # C++ parser, ~10x the csv module on big files
+    import pyarrow.csv as pacsv
+    import pyarrow.compute as pc
+except Exception:
+    pa = None
+
 CANDIDATE_DELIMS = [",", ";", "\t", "|"]
 
 def _detect_delimiter(text: str) -> str:
     lines = [ln for ln in text.splitlines() if ln.strip()][:50]
     if not lines:
         return ","
+    # one pass over the lines tallying every delimiter at once
+    counts: Dict[str, list] = {d: [] for d in CANDIDATE_DELIMS}
+    for ln in lines:
+        for d in CANDIDATE_DELIMS:
+            counts[d].append(ln.count(d) + 1)
     best_delim, best_var, best_modal = ",", float("inf"), 0
-    for d in CANDIDATE_DELIMS:
-        cols = [ln.count(d) + 1 for ln in lines]
-        if not cols:
-            continue
-        modal = max(set(cols), key=cols.count)
+    for d, cols in counts.items():
+        # Counter is one hashed pass; max(set(cols), key=cols.count) was
+        # quadratic in the line window
+        modal, _ = Counter(cols).most_common(1)[0]
         var = sum((c - modal) ** 2 for c in cols)
         if (var < best_var) or (var == best_var and modal > best_modal):
             best_delim, best_var, best_modal = d, var, modal
     return best_delim
 
-def _sniff_text_encoding(path: Path) -> str:
-    with open(path, "rb") as fb:
-        head = fb.read(4096)
+def _sniff_encoding(head: bytes) -> str:
     if head.startswith(b"\xff\xfe"): return "utf-16-le"
     if head.startswith(b"\xfe\xff"): return "utf-16-be"
     if head.startswith(b"\xef\xbb\xbf"): return "utf-8-sig"
     if b"\x00" in head[:100]: return "utf-16-le"
+    if head.isascii():  # the common no-BOM case: no throwaway decode
+        return "utf-8"
     try:
         head.decode("utf-8"); return "utf-8"
     except Exception:
         return "cp1252"
 
 def _norm_header(h: str) -> str:
-    return re.sub(r"[^a-z0-9]+", "", h.strip().lower())
+    return _NONALNUM_RE.sub("", h.strip().lower())
 
 BASE_FORMATTED_SYNS = {
     "wellidentifier", "formatteduwi", "welluwiformatted",
@@ -607,83 +708,181 @@ def _is_formatted_header_key(key: str) -> bool:
 def _is_numeric_uwi_key(key: str) -> bool:
     return key in NUMERIC_UWI_SYNS or ("uwi" in key and "formatted" not in key and "identifier" not in key)
 
-def _drop_all_empty_columns(rows: list[list[str]]) -> list[list[str]]:
-    if not rows:
-        return rows
-    cols = list(zip(*rows))
-    keep_idx = []
-    for i, col in enumerate(cols):
-        data_cells = col[1:]
-        if any((c or "").strip() for c in data_cells):
-            keep_idx.append(i)
-    new_rows = []
-    for r in rows:
-        new_rows.append([r[i] for i in keep_idx])
-    return new_rows
+@lru_cache(maxsize=4096)
+def _classify_header(key: str) -> Optional[str]:
+    """'F' (formatted UWI) / 'N' (numeric UWI) / None, classified once per
+    distinct normalized header — Tableau column names repeat across all
+    wells and sheets."""
+    if _is_formatted_header_key(key): return "F"
+    if _is_numeric_uwi_key(key): return "N"
+    return None
+
+def _normalize_csv_arrow(path: Path, short_uwi: str, wrapped_uwi: str,
+                         dashboard: str, sheet: str,
+                         enc: str, delim: str, header: List[str]) -> None:
+    """Same transform as the csv-module path, run on pyarrow's C++ parser.
+    Every column is read as string so values round-trip byte-for-byte."""
+    tbl = pacsv.read_csv(
+        str(path),
+        read_options=pacsv.ReadOptions(encoding=enc),
+        parse_options=pacsv.ParseOptions(delimiter=delim),
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in header},
+            null_values=[], strings_can_be_null=False))
+    names, seen_formatted = [], False
+    for c in tbl.column_names:
+        kind = _classify_header(_norm_header(c))
+        if kind == "F" and not seen_formatted:
+            names.append("UWI_Formatted"); seen_formatted = True
+        elif kind == "N":
+            names.append("UWI_Numeric")
+        else:
+            names.append(c.strip())
+    tbl = tbl.rename_columns(names)
+
+    if ADD_UWI_FORMATTED:
+        if not seen_formatted:
+            tbl = tbl.append_column("UWI_Formatted",
+                                    pa.array([wrapped_uwi] * len(tbl), pa.string()))
+        else:
+            i = names.index("UWI_Formatted")
+            col = tbl.column(i)
+            filled = pc.if_else(pc.equal(pc.utf8_trim_whitespace(col), ""),
+                                pa.scalar(wrapped_uwi), col)
+            tbl = tbl.set_column(i, "UWI_Formatted", filled)
+    if ADD_UWI_SHORT and "UWI_Short" not in tbl.column_names:
+        tbl = tbl.append_column("UWI_Short", pa.array([short_uwi] * len(tbl), pa.string()))
+    if ADD_PROVENANCE:
+        if "Dashboard" not in tbl.column_names:
+            tbl = tbl.append_column("Dashboard", pa.array([dashboard] * len(tbl), pa.string()))
+        if "Sheet" not in tbl.column_names:
+            tbl = tbl.append_column("Sheet", pa.array([sheet] * len(tbl), pa.string()))
+    if STRIP_EMPTY_TRAILING_COLS and len(tbl):
+        drop = [c for c in tbl.column_names
+                if not pc.any(pc.not_equal(pc.utf8_trim_whitespace(tbl.column(c)), "")).as_py()]
+        if drop:
+            tbl = tbl.drop_columns(drop)
+
+    tmp = path.with_suffix(".csv.tmp")
+    with open(tmp, "wb") as f:
+        f.write(b"\xef\xbb\xbf")  # keep the utf-8-sig convention
+        pacsv.write_csv(tbl, f, pacsv.WriteOptions(delimiter=delim))
+    os.replace(tmp, path)
 
 def normalize_csv_file(path: Path, short_uwi: str, wrapped_uwi: str,
                        dashboard: str, sheet: str) -> None:
     if path.suffix.lower() != ".csv":
         return
-    enc = _sniff_text_encoding(path)
-    raw = path.read_text(encoding=enc, errors="replace")
-    delim = _detect_delimiter(raw)
-    parsed: list[list[str]] = [next(csv.reader([ln], delimiter=delim)) for ln in raw.splitlines()]
-    if not parsed:
+
+    # One 4KB binary read feeds both the fast-skip probe and the encoding
+    # sniff instead of opening the file once for each.
+    try:
+        with open(path, "rb") as f:
+            head = f.read(4096)
+    except OSError:
         return
-    header = [h.strip() for h in parsed[0]]
-    data   = parsed[1:]
 
-    mapped = []
-    seen_formatted_idx = None
+    # A previous run's output already has our BOM and appended columns;
+    # don't pay a full read+rewrite just to produce the same bytes.
+    if FAST_SKIP_NORMALIZED and head.startswith(b"\xef\xbb\xbf"):
+        first = head.split(b"\n", 1)[0]
+        if (b"UWI_Short" in first and b"Dashboard" in first
+                and b"Sheet" in first):
+            return
+
+    enc = _sniff_encoding(head)
+
+    if pa is not None:
+        try:
+            with open(path, "r", encoding=enc, errors="replace", newline="") as f:
+                peek = f.read(8192)
+            delim = _detect_delimiter(peek)
+            header = next(csv.reader(peek.splitlines(True), delimiter=delim), None)
+            if header:
+                _normalize_csv_arrow(path, short_uwi, wrapped_uwi, dashboard,
+                                     sheet, enc, delim, header)
+                return
+        except Exception:
+            pass  # odd file; the tolerant csv-module path below handles it
+
+    # Streaming rewrite: rows flow reader -> transform -> writer one at a
+    # time, so peak memory is one row instead of ~3x the file (raw text +
+    # parsed rows + rebuilt rows). A first pass records which columns hold
+    # data, and only when the empty-column drop is enabled.
+    with open(path, "r", encoding=enc, errors="replace", newline="") as fin:
+        delim = _detect_delimiter(fin.read(8192))
+        fin.seek(0)
+        r = csv.reader(fin, delimiter=delim)
+        header = next(r, None)
+        if header is None:
+            return
+        width = len(header)
+        nonempty = bytearray(width)
+        if STRIP_EMPTY_TRAILING_COLS:
+            for row in r:
+                if len(row) > width:
+                    nonempty.extend(b"\x00" * (len(row) - width)); width = len(row)
+                for i, cell in enumerate(row):
+                    if not nonempty[i] and cell.strip():
+                        nonempty[i] = 1
+
+    header = [h.strip() for h in header] + [""] * (width - len(header))
+    mapped, seen_formatted_idx = [], None
     for i, h in enumerate(header):
-        key = _norm_header(h)
-        if _is_formatted_header_key(key):
+        kind = _classify_header(_norm_header(h))
+        if kind == "F":
             mapped.append("UWI_Formatted"); seen_formatted_idx = i
-        elif _is_numeric_uwi_key(key):
+        elif kind == "N":
             mapped.append("UWI_Numeric")
         else:
             mapped.append(h)
-    header = mapped
-
-    if ADD_UWI_FORMATTED:
-        if seen_formatted_idx is None:
-            header.append("UWI_Formatted")
-            for r in data: r.append(wrapped_uwi)
-        else:
-            for r in data:
-                if seen_formatted_idx < len(r):
-                    if not (r[seen_formatted_idx] or "").strip():
-                        r[seen_formatted_idx] = wrapped_uwi
-
-    if ADD_UWI_SHORT:
-        if "UWI_Short" not in header:
-            header.append("UWI_Short")
-            for r in data: r.append(short_uwi)
 
+    # constant columns appended to every row
+    extra: list = []
+    if ADD_UWI_FORMATTED and seen_formatted_idx is None:
+        extra.append(("UWI_Formatted", wrapped_uwi))
+    if ADD_UWI_SHORT and "UWI_Short" not in mapped:
+        extra.append(("UWI_Short", short_uwi))
     if ADD_PROVENANCE:
-        if "Dashboard" not in header:
-            header.append("Dashboard")
-            for r in data: r.append(dashboard)
-        if "Sheet" not in header:
-            header.append("Sheet")
-            for r in data: r.append(sheet)
-
-    out_rows = [header] + data
-    if STRIP_EMPTY_TRAILING_COLS:
-        out_rows = _drop_all_empty_columns(out_rows)
+        if "Dashboard" not in mapped: extra.append(("Dashboard", dashboard))
+        if "Sheet" not in mapped: extra.append(("Sheet", sheet))
+
+    # an all-blank UWI_Formatted column gets back-filled below, so it must
+    # survive the empty-column drop
+    if ADD_UWI_FORMATTED and seen_formatted_idx is not None:
+        nonempty[seen_formatted_idx] = 1
+    keep = [i for i in range(width) if nonempty[i]] if STRIP_EMPTY_TRAILING_COLS else list(range(width))
+    out_header = [mapped[i] for i in keep] + [n for n, _ in extra]
+    extra_vals = [v for _, v in extra]
+    fi = seen_formatted_idx if ADD_UWI_FORMATTED else None
 
     tmp = path.with_suffix(".csv.tmp")
-    with open(tmp, "w", encoding="utf-8-sig", newline="") as f:
-        w = csv.writer(f, delimiter=delim, quoting=csv.QUOTE_MINIMAL)
-        w.writerows(out_rows)
-    tmp.replace(path)
+    with open(path, "r", encoding=enc, errors="replace", newline="") as fin, \
+         open(tmp, "w", encoding="utf-8-sig", newline="") as fout:
+        r = csv.reader(fin, delimiter=delim)
+        w = csv.writer(fout, delimiter=delim, quoting=csv.QUOTE_MINIMAL)
+        next(r, None)
+        w.writerow(out_header)
+        for row in r:
+            if len(row) < width:
+                row = row + [""] * (width - len(row))
+            if fi is not None and not (row[fi] or "").strip():
+                row[fi] = wrapped_uwi
+            w.writerow([row[i] for i in keep] + extra_vals)
+    os.replace(tmp, path)
 
 # --------------- per-well & per-dashboard ---------------
+def _normalize_quiet(saved: Path, short_uwi: str, dash_code: str, sheet: str):
+    try:
+        normalize_csv_file(saved, short_uwi, wrap_uwi(short_uwi), dash_code, sheet)
+    except Exception as e:
+        log(f"      [{dash_code}] note: normalize failed on {saved.name}: {e}")
+
 def process_one_dashboard(driver, worker_tmp_dir: Path, well_root: Path, short_uwi: str,
                           dash_code: str, dash_base: str,
                           allow_sheets: Optional[List[str]],
-                          force: bool):
+                          force: bool,
+                          norm_pool: Optional[ThreadPoolExecutor] = None):
     dash_dir = well_root / dash_code
     dash_dir.mkdir(parents=True, exist_ok=True)
 
@@ -694,7 +893,7 @@ def process_one_dashboard(driver, worker_tmp_dir: Path, well_root: Path, short_u
         )
         # If we have a manifest and nothing is missing, skip the dashboard entirely
         if manifest_sheets is not None and missing_from_manifest is not None and len(missing_from_manifest) == 0:
-            print(f"      [{dash_code}] ✓ All listed sheets already downloaded — skipping.")
+            log(f"      [{dash_code}] ✓ All listed sheets already downloaded — skipping.")
             return
 
     # Open dashboard UI (we might need to refresh manifest OR get the actual missing)
@@ -704,61 +903,77 @@ def process_one_dashboard(driver, worker_tmp_dir: Path, well_root: Path, short_u
 
     state = open_crosstab_and_wait_state(driver)
     if state == "empty":
-        (dash_dir / "sheets.txt").write_text("", encoding="utf-8")
-        print(f"      [{dash_code}] No sheets to select — skipping.")
+        _atomic_write_text(dash_dir / "sheets.txt", "")
+        log(f"      [{dash_code}] No sheets to select — skipping.")
         close_dialog(driver)
         return
 
     ensure_csv_format(driver)
     sheets = list_crosstab_sheets(driver)
-    (dash_dir / "sheets.txt").write_text("\n".join(sheets), encoding="utf-8")
-    print(f"      [{dash_code}] sheets (raw): {sheets}")
+    _atomic_write_text(dash_dir / "sheets.txt", "\n".join(sheets))
+    log(f"      [{dash_code}] sheets (raw): {sheets}")
 
     # Apply allow-list
-    filtered = [s for s in sheets if should_keep_sheet(s, allow_sheets)]
+    norm_allow = _prepare_allow(allow_sheets)
+    filtered = [s for s in sheets if should_keep_sheet(s, norm_allow)]
     if allow_sheets is not None:
-        print(f"      [{dash_code}] filtered -> {filtered}")
+        log(f"      [{dash_code}] filtered -> {filtered}")
 
     if not filtered:
         close_dialog(driver)
         return
     pause()
 
-    # If not forcing, trim to only truly missing files
+    # If not forcing, trim to only truly missing files (one dir listing
+    # instead of two stats per sheet)
+    index = _index_dash_dir(dash_dir)
     if not force:
         missing_only = []
         for sheet in filtered:
             safe_sheet = sanitize_name(sheet)
-            csv_path  = dash_dir / f"{short_uwi}__{safe_sheet}.csv"
-            xlsx_path = dash_dir / f"{short_uwi}__{safe_sheet}.xlsx"
-            if not (csv_path.exists() or xlsx_path.exists()):
+            if not (f"{short_uwi}__{safe_sheet}.csv" in index
+                    or f"{short_uwi}__{safe_sheet}.xlsx" in index):
                 missing_only.append(sheet)
         if not missing_only:
-            print(f"      [{dash_code}] ✓ All filtered sheets already downloaded — skipping.")
+            log(f"      [{dash_code}] ✓ All filtered sheets already downloaded — skipping.")
             close_dialog(driver)
             return
         filtered = missing_only
-        print(f"      [{dash_code}] will download missing only -> {filtered}")
+        log(f"      [{dash_code}] will download missing only -> {filtered}")
 
     # Download selected sheets
+    norm_futures: list = []
+    dialog_open = True  # just listed sheets, so the dialog is up
     for sheet in filtered:
         safe_sheet = sanitize_name(sheet)
-        # Re-check existence in case of races between workers
+        # Re-check against the index (kept current with our own saves) in
+        # case of races between workers
         if not force:
-            existing_csv  = dash_dir / f"{short_uwi}__{safe_sheet}.csv"
-            existing_xlsx = dash_dir / f"{short_uwi}__{safe_sheet}.xlsx"
-            if existing_csv.exists() or existing_xlsx.exists():
-                print(f"      [{dash_code}] ✓ SKIP (already exists): {safe_sheet}")
+            if (f"{short_uwi}__{safe_sheet}.csv" in index
+                    or f"{short_uwi}__{safe_sheet}.xlsx" in index):
+                log(f"      [{dash_code}] ✓ SKIP (already exists): {safe_sheet}")
                 continue
 
-        try:
-            state = open_crosstab_and_wait_state(driver)
-        except TimeoutException:
-            guard_session_reset(driver)
-            state = open_crosstab_and_wait_state(driver)
+        # Reuse the dialog when it survived the previous export: skips the
+        # flyout -> crosstab -> wait round trip (~1-2s of UI churn) per sheet.
+        state = None
+        if dialog_open:
+            try:
+                st = crosstab_state(driver)
+                if st == "ready":
+                    state = st
+            except Exception:
+                pass
+        if state is None:
+            try:
+                state = open_crosstab_and_wait_state(driver)
+            except TimeoutException:
+                guard_session_reset(driver)
+                state = open_crosstab_and_wait_state(driver)
+        dialog_open = True
 
         if state == "empty":
-            print(f"      [{dash_code}] became empty unexpectedly — stopping.")
+            log(f"      [{dash_code}] became empty unexpectedly — stopping.")
             close_dialog(driver)
             break
 
@@ -773,38 +988,25 @@ def process_one_dashboard(driver, worker_tmp_dir: Path, well_root: Path, short_u
 
         saved = wait_for_download_and_move(worker_tmp_dir, dash_dir, short_uwi, sheet, timeout=180)
         if saved:
-            try:
-                normalize_csv_file(saved, short_uwi, wrap_uwi(short_uwi), dash_code, sheet)
-            except Exception as e:
-                print(f"      [{dash_code}] note: normalize failed on {saved.name}: {e}")
-            print(f"      [{dash_code}] ✓ {sheet} -> {saved.name}")
+            index.add(saved.name)
+            # normalize off-thread so the browser can start the next sheet
+            # instead of blocking on a multi-MB rewrite
+            if norm_pool is not None:
+                norm_futures.append(norm_pool.submit(_normalize_quiet, saved, short_uwi, dash_code, sheet))
+            else:
+                _normalize_quiet(saved, short_uwi, dash_code, sheet)
+            log(f"      [{dash_code}] ✓ {sheet} -> {saved.name}")
         else:
-            print(f"      [{dash_code}] ✗ {sheet} -> download timed out")
+            log(f"      [{dash_code}] ✗ {sheet} -> download timed out")
         pause()
 
+    if norm_futures:
+        futures_wait(norm_futures)
+
     # Leave dialog open/closed state clean
     close_dialog(driver)
 
 
-def process_one_well(driver, worker_tmp_dir: Path, out_base: Path, raw_uwi: str,
-                     selected_dashboards: List[str],
-                     sheets_map: Optional[Dict[str, List[str]]],
-                     force: bool = False):
-    short_uwi = to_short_uwi(raw_uwi)
-    well_root = out_base / sanitize_name(short_uwi)
-    well_root.mkdir(parents=True, exist_ok=True)
-    print(f"   -> {raw_uwi}  (short: {short_uwi})")
-
-    for code in selected_dashboards:
-        base = DASHBOARDS[code]
-        try:
-            allow = None if sheets_map is None else sheets_map.get(code, sheets_map.get("*"))
-            process_one_dashboard(driver, worker_tmp_dir, well_root, short_uwi, code, base, allow, force)
-        except Exception as e:
-            print(f"      [{code}] ERROR: {e}")
-        pause()
-
-
 # --------------- multiprocessing ---------------
 def worker_main(worker_id: int, wells: List[str],
                 selected_dashboards: List[str],
@@ -814,28 +1016,37 @@ def worker_main(worker_id: int, wells: List[str],
     tmp_dir.mkdir(parents=True, exist_ok=True)
 
     driver = None
+    norm_pool = ThreadPoolExecutor(max_workers=1)  # background CSV normalization
     try:
         driver = make_driver(tmp_dir)
-        for idx, uwi in enumerate(wells, 1):
-            print(f"[worker {worker_id}] ({idx}/{len(wells)}) {uwi}")
-            try:
-                process_one_well(driver, tmp_dir, OUT_BASE, uwi,
-                                 selected_dashboards, sheets_map, force)
-            except Exception as e:
-                print(f"[worker {worker_id}] ERROR on {uwi}: {e}")
-                # recycle driver & retry once
-                try:
-                    driver.quit()
-                except Exception:
-                    pass
-                driver = make_driver(tmp_dir)
+        # Group by dashboard, not by well: all wells of one dashboard run
+        # back to back, so its JS bundle, HTTP cache entries and session
+        # cookies stay hot instead of being evicted on every flip.
+        for code in selected_dashboards:
+            base = DASHBOARDS[code]
+            allow = None if sheets_map is None else sheets_map.get(code, sheets_map.get("*"))
+            for idx, uwi in enumerate(wells, 1):
+                short_uwi = to_short_uwi(uwi)
+                well_root = OUT_BASE / sanitize_name(short_uwi)
+                well_root.mkdir(parents=True, exist_ok=True)
+                log(f"[worker {worker_id}] [{code}] ({idx}/{len(wells)}) {uwi}")
                 try:
-                    process_one_well(driver, tmp_dir, OUT_BASE, uwi,
-                                     selected_dashboards, sheets_map, force)
-                except Exception as e2:
-                    print(f"[worker {worker_id}] RETRY failed on {uwi}: {e2}")
-            pause()
+                    process_one_dashboard(driver, tmp_dir, well_root, short_uwi, code, base, allow, force, norm_pool)
+                except Exception as e:
+                    log(f"[worker {worker_id}] ERROR on {uwi} [{code}]: {e}")
+                    # recycle driver & retry once
+                    try:
+                        driver.quit()
+                    except Exception:
+                        pass
+                    driver = make_driver(tmp_dir)
+                    try:
+                        process_one_dashboard(driver, tmp_dir, well_root, short_uwi, code, base, allow, force, norm_pool)
+                    except Exception as e2:
+                        log(f"[worker {worker_id}] RETRY failed on {uwi} [{code}]: {e2}")
+                pause()
     finally:
+        norm_pool.shutdown(wait=True)
         try:
             if driver: driver.quit()
         except Exception:
@@ -877,16 +1088,16 @@ def main():
 
     wells = load_wells(args.wells)
     if not wells:
-        print("No UWIs in wells.txt"); sys.exit(1)
+        log("No UWIs in wells.txt"); sys.exit(1)
 
     selected_dashboards = parse_dashboards_spec(args.dashboards)
     sheets_map = parse_sheets_spec(args.sheets)
 
-    print(f"[info] Dashboards: {selected_dashboards}")
+    log(f"[info] Dashboards: {selected_dashboards}")
     if sheets_map is None:
-        print("[info] Sheets: ALL")
+        log("[info] Sheets: ALL")
     else:
-        print(f"[info] Sheets filter: {sheets_map}")
+        log(f"[info] Sheets filter: {sheets_map}")
 
     groups = chunkify(wells, args.workers)
     procs: List[Process] = []
@@ -1,10 +1,10 @@
 # aer_multi_dash_mp.py
 # Multi-process AER Tableau scraper (dialect-preserving CSV, per-dash flags, wells.txt label naming)
 
-import os, sys, time, re, shutil, argparse, html, csv, io, platform
+import atexit, os, signal, sys, time, re, shutil, argparse, html, csv, io, platform
 from pathlib import Path
 from urllib.parse import quote
-from multiprocessing import Process, set_start_method
+from multiprocessing import get_context, TimeoutError as MpTimeout
 from typing import List, Optional, Dict, Tuple
 
 # ---- Extra S3 helpers (implement in s3_merge, or these stubs fall back safely) ----
@@ -27,10 +27,13 @@ except Exception:
     def start_lock_heartbeat(lock_id: str): return _HB()
 
 try:
-    from s3_merge import s3_exists, s3_copyto_if_new
+    from s3_merge import s3_exists, s3_copyto_if_new, s3_upload_many, preload_existing, seed_existing
 except Exception:
     def s3_exists(key: str) -> bool: return False
     def s3_copyto_if_new(path: Path, key: str) -> bool: return False
+    def s3_upload_many(pairs) -> int: return 0
+    def preload_existing(prefix: str = "Data/") -> set: return set()
+    def seed_existing(keys) -> None: pass
 
 def s3_mark_inprogress(well_label: str):
     s3_put_text(f"Data/{well_label}/.INPROGRESS", "")
@@ -49,7 +52,13 @@ WELLS_FILE = "../wells.txt"
 OUT_BASE   = Path(os.environ.get("AER_OUT_BASE", "Data"))
 TIMEOUT    = 20
 DELAY      = 0.1
-WORKERS    = 2
+# Chromium is CPU/RAM heavy (1-2 per core at most); S3 uploads are idle
+# socket time and want far more concurrency. Two knobs, not one.
+WORKERS        = max(1, (os.cpu_count() or 4) // 2)
+UPLOAD_WORKERS = 32
+# Soft cap on one well's wall-clock time: if no well completes for this
+# long, some browser is considered wedged and the pool is restarted.
+MAX_WELL_SEC   = int(os.environ.get("AER_MAX_WELL_SEC", "900"))
 
 # CSV normalization toggles
 ADD_UWI_FORMATTED = True
@@ -146,7 +155,8 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+from selenium.common.exceptions import (TimeoutException, StaleElementReferenceException,
+                                        InvalidSessionIdException)
 
 def find_browser_binary():
     system = platform.system().lower()
@@ -188,6 +198,9 @@ def make_driver(download_dir: Path, headless: bool):
         else:
             if headless: opts.add_argument("--disable-gpu")
         opts.add_argument("--window-size=1400,1000")
+        # Persistent profile: restarted drivers reuse the warmed GPU/font
+        # caches instead of rebuilding a fresh profile every time.
+        opts.add_argument(f"--user-data-dir={(download_dir / 'profile').resolve()}")
         opts.add_experimental_option("prefs", {
             "download.default_directory": str(download_dir.resolve()),
             "download.prompt_for_download": False,
@@ -207,6 +220,7 @@ def make_driver(download_dir: Path, headless: bool):
                 opts.add_argument("--headless=new")
                 opts.add_argument("--disable-gpu")
             opts.add_argument("--window-size=1400,1000")
+            opts.add_argument(f"--user-data-dir={(download_dir / 'profile').resolve()}")
             opts.add_experimental_option("prefs", {
                 "download.default_directory": str(download_dir.resolve()),
                 "download.prompt_for_download": False,
@@ -480,7 +494,7 @@ def wait_for_download_and_move(worker_download_dir: Path,
 
     if candidate is None:
         files = [p for p in worker_download_dir.glob("*")
-                 if not p.name.endswith(".crdownload")]
+                 if p.is_file() and not p.name.endswith(".crdownload")]
         if not files:
             return None
         files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
@@ -872,6 +886,7 @@ def process_one_dashboard(driver,
 
     # ---------- 4) Download loop ----------
     success_count, fail_count = 0, 0
+    pending: List[Tuple[Path, str]] = []   # uploads deferred to one threaded batch
     for sheet in to_get:
         safe_sheet = sanitize_name(sheet)
 
@@ -918,32 +933,24 @@ def process_one_dashboard(driver,
 
         if push_to_s3:
             rel = saved.relative_to(OUT_BASE)
-            remote_key = f"Data/{rel.as_posix()}"
-            if s3_copyto_if_new(saved, remote_key):
-                print(f"      [{dash_code}] ↑ uploaded to S3: {remote_key}")
-                if purge_local:
-                    try:
-                        saved.unlink()
-                        print(f"      [{dash_code}] (purged local copy)")
-                    except Exception as e:
-                        print(f"      [{dash_code}] note: purge failed: {e}")
-            else:
-                print(f"      [{dash_code}] (S3 already has {remote_key}; skipped upload)")
+            pending.append((saved, f"Data/{rel.as_posix()}"))
 
         pause()
 
     close_dialog(driver)
 
-    # ---------- 5) Mark final status ----------
-    try:
-        # Re-check remote completeness after our uploads
-        r_all, r_missing = compute_missing_remote(well_label, dash_code, allow_sheets)
-        if r_all is not None and len(r_missing) == 0:
-            s3_mark_complete(well_label)
-        else:
-            s3_mark_incomplete(well_label)
-    except Exception:
-        s3_mark_incomplete(well_label)
+    # Push the whole dashboard's files in one concurrent batch instead of
+    # blocking the browser on each upload round trip.
+    if pending:
+        uploaded = s3_upload_many(pending)
+        print(f"      [{dash_code}] ↑ S3 batch: {uploaded} uploaded, {len(pending) - uploaded} skipped")
+        if purge_local:
+            for local, key in pending:
+                if s3_exists(key):  # answered from the cached listing
+                    try:
+                        local.unlink()
+                    except Exception as e:
+                        print(f"      [{dash_code}] note: purge failed: {e}")
 
 
 def process_one_well(driver, worker_tmp_dir: Path, out_base: Path, raw_uwi: str,
@@ -976,68 +983,243 @@ def process_one_well(driver, worker_tmp_dir: Path, out_base: Path, raw_uwi: str,
             print(f"      [{code}] ERROR: {e}")
         pause()
 
+    # Well-level status, written once per well: .COMPLETE only when EVERY
+    # selected dashboard is remote-complete, so the marker can be trusted
+    # as a skip-the-whole-scrape guard on later runs. (Previously each
+    # dashboard wrote it on its own, so one finished dashboard could mark
+    # a half-done well complete.)
+    if push_to_s3 or check_remote:
+        try:
+            complete = True
+            for code in selected_dashboards:
+                allow = None if sheets_map is None else sheets_map.get(code, sheets_map.get("*"))
+                r_all, r_missing = compute_missing_remote(well_label, code, allow)
+                if r_all is None or r_missing:
+                    complete = False
+                    break
+            if complete:
+                s3_mark_complete(well_label)
+            else:
+                s3_mark_incomplete(well_label)
+        except Exception:
+            s3_mark_incomplete(well_label)
+
 # --------------- multiprocessing ---------------
-def worker_main(worker_id: int, wells: List[str],
-                selected_dashboards: List[str],
-                sheets_map: Optional[Dict[str, List[str]]],
-                force: bool,
-                headless: bool,
-                timeout: int,
-                delay: float,
-                push_to_s3: bool = False,
-                purge_local: bool = False,
-                check_remote: bool = False):
-    global DELAY
-    DELAY = delay
+# Worker-process state, bound once by the Pool initializer. Wells are fed
+# through imap_unordered so a slow well only occupies its own browser
+# instead of stalling a pre-assigned chunk.
+WELLS_PER_DRIVER = 100   # recycle the browser periodically to bound memory drift
+
+_DRV = None
+_CFG: Dict = {}
+_WELL_COUNT = 0
 
-    tmp_dir = OUT_BASE / f"_tmp_worker_{worker_id}"
+def _quit_driver():
+    try:
+        if _DRV is not None: _DRV.quit()
+    except Exception:
+        pass
+
+def _init_worker(stagger_lock,
+                 pid_queue,
+                 out_base: str,
+                 selected_dashboards: List[str],
+                 sheets_map: Optional[Dict[str, List[str]]],
+                 force: bool,
+                 headless: bool,
+                 timeout: int,
+                 delay: float,
+                 push_to_s3: bool,
+                 purge_local: bool,
+                 check_remote: bool,
+                 upload_workers: int = UPLOAD_WORKERS,
+                 existing_keys=None):
+    global _DRV, _CFG, DELAY, OUT_BASE
+    DELAY = delay
+    OUT_BASE = Path(out_base)
+    # Own process group, reported to main(): pool.terminate() SIGTERMs the
+    # worker without running its atexit hooks, so on the hang path main()
+    # killpg's these groups to take the Chromium trees down too.
+    try:
+        os.setpgid(0, 0)
+    except Exception:
+        pass
+    try:
+        pid_queue.put(os.getpid())
+    except Exception:
+        pass
+    try:
+        import s3_merge
+        s3_merge.UPLOAD_WORKERS = max(1, upload_workers)
+    except Exception:
+        pass
+    if existing_keys:
+        # Snapshot of every key under Data/, scanned once in main(): all
+        # existence checks in this worker become set lookups.
+        seed_existing(existing_keys)
+    tmp_dir = OUT_BASE / f"_tmp_worker_{os.getpid()}"
     tmp_dir.mkdir(parents=True, exist_ok=True)
+    # Serialize browser launches across workers: N Chromiums all forking
+    # at once can trip pthread_create EAGAIN on low-ulimit hosts.
+    with stagger_lock:
+        _DRV = make_driver(tmp_dir, headless=headless)
+        time.sleep(0.25)
+    atexit.register(_quit_driver)
+    _CFG = dict(tmp_dir=tmp_dir,
+                selected_dashboards=selected_dashboards,
+                sheets_map=sheets_map,
+                force=force, timeout=timeout, headless=headless,
+                push_to_s3=push_to_s3,
+                purge_local=purge_local,
+                check_remote=check_remote)
+
+def _clean_download_dir(tmp_dir: Path):
+    """Sweep leftover download files (not the persistent profile dir)
+    between wells so stale exports never match the next well's watcher."""
+    try:
+        for p in tmp_dir.iterdir():
+            if p.is_file():
+                try: p.unlink()
+                except Exception: pass
+    except Exception:
+        pass
 
-    driver = None
+def _driver_alive() -> bool:
     try:
-        driver = make_driver(tmp_dir, headless=headless)
+        _DRV.execute_script("return 1")
+        return True
+    except Exception:
+        return False
 
-        for idx, uwi in enumerate(wells, 1):
-            lock_id = (uwi or "").strip()  # EXACT wells.txt entry for S3 locks
-            if not acquire_lock(lock_id):
-                print(f"[worker {worker_id}] LOCKED elsewhere: {lock_id}")
-                continue
-            hb = None
-            try:
-                hb = start_lock_heartbeat(lock_id)
-                process_one_well(driver, tmp_dir, OUT_BASE, uwi,
-                                 selected_dashboards, sheets_map, force, timeout,
-                                 push_to_s3=push_to_s3,
-                                 purge_local=purge_local,
-                                 check_remote=check_remote)
-            finally:
-                try:
-                    if hb and hasattr(hb, "stop"): hb.stop()
-                except Exception:
-                    pass
-                release_lock(lock_id)
-            pause()
+def _do_well(uwi: str) -> Tuple[str, bool]:
+    """Returns (uwi, handled): handled=False means we never processed the
+    well (e.g. another machine holds its lock) and it must not be counted
+    as completed by the restart bookkeeping in main()."""
+    global _DRV, _WELL_COUNT
+    if _WELL_COUNT >= WELLS_PER_DRIVER:
+        # Fresh browser every K wells, not only on errors: Chromium leaks
+        # across hundreds of Tableau loads and a scheduled restart is
+        # cheaper than an OOM kill mid-well.
+        _WELL_COUNT = 0
+        _quit_driver()
+        _DRV = make_driver(_CFG["tmp_dir"], headless=_CFG["headless"])
+    _WELL_COUNT += 1
+    # One existence check against the well-level sentinel saves the whole
+    # browser-driven scrape (tens of seconds) for already-finished wells.
+    if not _CFG["force"] and (_CFG["push_to_s3"] or _CFG["check_remote"]):
+        label = well_label_from_entry(uwi)
+        if s3_exists(f"Data/{label}/.COMPLETE"):
+            print(f"   -> {uwi}  ✓ remote COMPLETE — skipping")
+            return uwi, True
+    lock_id = (uwi or "").strip()  # EXACT wells.txt entry for S3 locks
+    if not acquire_lock(lock_id):
+        print(f"[worker {os.getpid()}] LOCKED elsewhere: {lock_id}")
+        return uwi, False
+    hb = None
+    try:
+        hb = start_lock_heartbeat(lock_id)
+        _clean_download_dir(_CFG["tmp_dir"])
+        try:
+            process_one_well(_DRV, _CFG["tmp_dir"], OUT_BASE, uwi,
+                             _CFG["selected_dashboards"], _CFG["sheets_map"],
+                             _CFG["force"], _CFG["timeout"],
+                             push_to_s3=_CFG["push_to_s3"],
+                             purge_local=_CFG["purge_local"],
+                             check_remote=_CFG["check_remote"])
+        except Exception as e:
+            print(f"[worker {os.getpid()}] well error on {lock_id}: {e}")
+            # Restarting Chromium costs ~1-2s even with the persistent
+            # profile; only do it when the session is actually dead.
+            if isinstance(e, InvalidSessionIdException) or not _driver_alive():
+                _quit_driver()
+                _DRV = make_driver(_CFG["tmp_dir"], headless=_CFG["headless"])
+            else:
+                try: _DRV.get("about:blank")
+                except Exception: pass
     finally:
         try:
-            if driver: driver.quit()
+            if hb and hasattr(hb, "stop"): hb.stop()
         except Exception:
             pass
-
-def chunkify(seq: List[str], n: int) -> List[List[str]]:
-    n = max(1, n)
-    k, m = divmod(len(seq), n)
-    out = []
-    start = 0
-    for i in range(n):
-        size = k + (1 if i < m else 0)
-        out.append(seq[start:start+size])
-        start += size
-    return out
+        release_lock(lock_id)
+    pause()
+    return uwi, True
 
 def load_wells(path: str) -> List[str]:
     with open(path, "r", encoding="utf-8") as f:
         return [ln.strip() for ln in f if ln.strip() and not ln.lstrip().startswith("#")]
 
+def _kill_worker_pgroups(pid_queue):
+    """terminate() skips the workers' atexit _quit_driver, stranding their
+    chromedriver/Chromium trees (including the wedged one a restart is
+    meant to clear). Each worker sits in its own process group, so kill
+    the groups to take the browsers down with them."""
+    if not hasattr(os, "killpg"):
+        return
+    while True:
+        try:
+            pid = pid_queue.get_nowait()
+        except Exception:
+            break
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except Exception:
+            pass
+
+def _drain_pool(ctx, workers: int, initargs, wells: List[str], pid_queue):
+    """Run wells through one pool lifetime. Returns (done, hung, err):
+    the set of handled wells, whether we bailed out on a hang, and
+    whether a worker failed hard."""
+    done: set = set()
+    hung = err = False
+    pool = ctx.Pool(max(1, workers), initializer=_init_worker, initargs=initargs)
+    try:
+        # chunksize=1: each finished well immediately frees its browser
+        # for the next one, so stragglers never strand idle workers.
+        it = pool.imap_unordered(_do_well, wells, chunksize=1)
+        while True:
+            try:
+                uwi, handled = it.next(timeout=MAX_WELL_SEC)
+                # locked-elsewhere wells stay in remaining: after a hang
+                # restart the dead worker's lock is still live and they
+                # would otherwise be silently dropped for the whole run
+                if handled:
+                    done.add(uwi)
+            except StopIteration:
+                break
+            except MpTimeout:
+                # With every worker healthy a completion lands at least
+                # every MAX_WELL_SEC; silence that long means a wedged
+                # browser (Selenium can hang forever on a broken GPU).
+                print(f"[warn] no well finished in {MAX_WELL_SEC}s — restarting workers "
+                      f"({len(done)}/{len(wells)} done)")
+                hung = True
+                break
+            except Exception as e:
+                print(f"[error] worker failure: {e}")
+                err = True
+                break
+    finally:
+        if hung or err:
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+        if hung or err:
+            _kill_worker_pgroups(pid_queue)
+    return done, hung, err
+
+def _check_proc_limit(workers: int):
+    try:
+        import resource
+        soft, _hard = resource.getrlimit(resource.RLIMIT_NPROC)
+    except Exception:
+        return  # Windows / restricted env: nothing to check
+    if soft != resource.RLIM_INFINITY and soft < workers * 200:
+        print(f"[warn] ulimit -u is {soft}: each Chromium needs dozens of threads, "
+              f"so {workers} browsers may fail with 'pthread_create: EAGAIN'. "
+              f"Raise it (e.g. 'ulimit -u 8192') if workers crash at startup.")
+
 # --------------------- main ---------------------
 def parse_dashboards_spec(spec: Optional[str]) -> List[str]:
     if not spec or _norm_name(spec) == "all":
@@ -1080,7 +1262,10 @@ def parse_sheets_spec(spec: Optional[str]) -> Optional[Dict[str, List[str]]]:
 def main():
     global OUT_BASE
     parser = argparse.ArgumentParser(description="AER dashboards multi-scraper (idempotent, S3 locks optional).")
-    parser.add_argument("--workers", type=int, default=WORKERS, help="Number of parallel browser windows")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help=f"Number of parallel browser windows (default: half the cores = {WORKERS})")
+    parser.add_argument("--upload-workers", type=int, default=UPLOAD_WORKERS,
+                        help="Concurrent S3 upload threads per worker (I/O-bound; default 32)")
     parser.add_argument("--wells", type=str, default=WELLS_FILE, help="Path to wells.txt")
     parser.add_argument("--dashboards", type=str, default="all",
                         help=("Which dashboards to scrape. Examples:\n"
@@ -1120,29 +1305,48 @@ def main():
     print(f"[info] OUT_BASE: {OUT_BASE.resolve()}")
     print(f"[info] Headless: {args.headless}, Timeout: {args.timeout}s, Delay: {args.delay}s")
 
-    groups = chunkify(wells, args.workers)
-    procs: List[Process] = []
-    for wid, group in enumerate(groups, 1):
-        p = Process(target=worker_main, args=(
-            wid, group, selected_dashboards, sheets_map,
-            args.force, args.headless, args.timeout, args.delay
-        ), kwargs=dict(push_to_s3=args.push_to_s3,
-                       purge_local=args.purge_local,
-                       check_remote=args.check_remote),
-                    daemon=False)
-        p.start()
-        procs.append(p)
+    _check_proc_limit(args.workers)
+
+    existing = set()
+    if args.push_to_s3 or args.check_remote:
+        # One bulk LIST up front (1000 keys per request) replaces the
+        # per-file existence probes in every worker.
+        existing = preload_existing("Data/")
+        if existing:
+            print(f"[info] preloaded {len(existing)} existing S3 keys under Data/")
+
+    # Explicit spawn context: same behavior on every platform, and the
+    # shared read-only config is pickled exactly once per worker via the
+    # initializer instead of travelling with every task.
+    ctx = get_context("spawn")
+    stagger = ctx.Lock()
+    worker_pids = ctx.Queue()
+    initargs = (stagger, worker_pids, str(OUT_BASE), selected_dashboards, sheets_map,
+                args.force, args.headless, args.timeout, args.delay,
+                args.push_to_s3, args.purge_local, args.check_remote,
+                args.upload_workers, existing)
 
     exit_code = 0
-    for p in procs:
-        p.join()
-        if p.exitcode not in (0, None):
-            exit_code = p.exitcode
+    remaining = wells
+    strikes = 0   # consecutive restarts with zero progress
+    while remaining:
+        done, hung, err = _drain_pool(ctx, args.workers, initargs, remaining, worker_pids)
+        remaining = [w for w in remaining if w not in done]
+        if err:
+            exit_code = 1
+            break
+        if not hung:
+            if remaining:
+                print(f"[info] {len(remaining)} wells left unhandled this run "
+                      f"(locked by another machine); rerun to pick them up")
+            break
+        strikes = 0 if done else strikes + 1
+        if strikes >= 2:
+            print(f"[error] {len(remaining)} wells made no progress across repeated "
+                  f"restarts — giving up on them this run")
+            exit_code = 1
+            break
     sys.exit(exit_code)
 
 if __name__ == "__main__":
-    try:
-        set_start_method("spawn")
-    except RuntimeError:
-        pass
     main()
@@ -4,6 +4,11 @@ from datetime import datetime, timezone
 from urllib.parse import quote   # <-- add this
 from typing import List, Optional, Dict, Tuple
 
+try:
+    from s3_merge import s3_client, BUCKET
+except Exception:
+    def s3_client(): return None
+    BUCKET = ""
 
 
 REMOTE = os.environ.get("AER_REMOTE", "aer:aer-scrape-prod")
@@ -27,8 +32,41 @@ def _lsjson(remote_key: str):
     except subprocess.CalledProcessError:
         return None
 
+def _payload() -> str:
+    return json.dumps({
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        "started_at": datetime.now(timezone.utc).isoformat()  # OK now
+    }, indent=2)
+
 def acquire_lock(uwi: str) -> bool:
     key = _key(uwi)
+    c = s3_client()
+    if c is not None:
+        # Conditional PUT closes the list-then-write window where two
+        # workers both see "no lock" and both write one.
+        body = _payload().encode("utf-8")
+        try:
+            c.put_object(Bucket=BUCKET, Key=key, Body=body, IfNoneMatch="*")
+            return True
+        except Exception as e:
+            code = getattr(e, "response", {}).get("Error", {}).get("Code", "")
+            if code not in ("PreconditionFailed", "ConditionalRequestConflict"):
+                print(f"[lock] acquire failed for {key}: {e}")
+                return False
+        # Held by someone; take over only if it outlived its TTL.
+        try:
+            head = c.head_object(Bucket=BUCKET, Key=key)
+            age = time.time() - head["LastModified"].timestamp()
+            if age <= LOCK_TTL_SECONDS:
+                return False
+            c.delete_object(Bucket=BUCKET, Key=key)
+            c.put_object(Bucket=BUCKET, Key=key, Body=body, IfNoneMatch="*")
+            return True
+        except Exception as e:
+            print(f"[lock] stale-lock takeover failed for {key}: {e}")
+            return False
+
     meta = _lsjson(key)
     now = time.time()
     if meta:
@@ -40,32 +78,65 @@ def acquire_lock(uwi: str) -> bool:
         if (now - mtime) < LOCK_TTL_SECONDS:
             return False  # fresh lock exists
 
-    payload = json.dumps({
-        "host": socket.gethostname(),
-        "pid": os.getpid(),
-        "started_at": datetime.now(timezone.utc).isoformat()  # OK now
-    }, indent=2)
-
-    p = subprocess.run(["rclone", "rcat", f"{REMOTE}/{key}"], input=payload, text=True)
+    p = subprocess.run(["rclone", "rcat", f"{REMOTE}/{key}"], input=_payload(), text=True)
     return p.returncode == 0
 
 def release_lock(uwi: str):
     key = _key(uwi)
+    c = s3_client()
+    if c is not None:
+        try:
+            c.delete_object(Bucket=BUCKET, Key=key)
+        except Exception:
+            pass
+        return
     subprocess.run(["rclone", "deletefile", f"{REMOTE}/{key}"], check=False)
 
 def touch_lock(uwi: str):
-    key = _key(uwi)
+    _touch_key(_key(uwi))
+
+def _touch_key(key: str):
+    c = s3_client()
+    if c is not None:
+        try:
+            c.copy_object(Bucket=BUCKET, Key=key,
+                          CopySource={"Bucket": BUCKET, "Key": key},
+                          MetadataDirective="REPLACE")  # refresh LastModified
+        except Exception:
+            pass
+        return
     subprocess.run(["rclone", "touch", f"{REMOTE}/{key}"], check=False)
 
-def start_lock_heartbeat(uwi: str):
-    """Keep the lock fresh in the background."""
-    def _loop():
-        while True:
+# One scheduler thread keeps every held lock fresh, instead of a thread
+# per UWI piling up across a worker's run.
+_HB_KEYS: set = set()
+_HB_LOCK = threading.Lock()
+_HB_THREAD = None
+
+def _hb_loop():
+    while True:
+        time.sleep(HEARTBEAT_SEC)
+        with _HB_LOCK:
+            keys = list(_HB_KEYS)
+        for k in keys:
             try:
-                touch_lock(uwi)
+                _touch_key(k)
             except Exception:
                 pass
-            time.sleep(HEARTBEAT_SEC)
-    t = threading.Thread(target=_loop, daemon=True)
-    t.start()
-    return t
+
+class _Heartbeat:
+    def __init__(self, uwi: str):
+        global _HB_THREAD
+        self.key = _key(uwi)
+        with _HB_LOCK:
+            _HB_KEYS.add(self.key)
+            if _HB_THREAD is None:
+                _HB_THREAD = threading.Thread(target=_hb_loop, daemon=True)
+                _HB_THREAD.start()
+    def stop(self):
+        with _HB_LOCK:
+            _HB_KEYS.discard(self.key)
+
+def start_lock_heartbeat(uwi: str):
+    """Keep the lock fresh in the background."""
+    return _Heartbeat(uwi)
@@ -1,32 +1,226 @@
 # s3_merge.py
-import json, os, subprocess
+import atexit, json, os, socket, subprocess, threading, time
+import http.client
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config as _BotoConfig
+    from botocore.exceptions import ClientError
+except Exception:
+    boto3 = None
+    ClientError = Exception
+
+# Parallel 8 MiB parts for the occasional big Excel/PDF export; small CSVs
+# stay on the single-request path.
+_MULTIPART_MIN = 8 << 20
+_TC = TransferConfig(multipart_threshold=_MULTIPART_MIN,
+                     multipart_chunksize=_MULTIPART_MIN,
+                     max_concurrency=16, use_threads=True) if boto3 is not None else None
+
 REMOTE = os.environ.get("AER_REMOTE", "aer:aer-scrape-prod")
+BUCKET = os.environ.get("AER_S3_BUCKET", REMOTE.split(":", 1)[-1])
+
+_S3 = None
+def s3_client():
+    """One boto3 client per process (reused TLS connections, no fork/exec
+    per call); None when boto3 is missing or AER_S3_NATIVE=0."""
+    global _S3
+    if _S3 is None and boto3 is not None and os.environ.get("AER_S3_NATIVE", "1") != "0":
+        _S3 = boto3.client("s3", config=_BotoConfig(
+            max_pool_connections=64,
+            retries={"max_attempts": 10, "mode": "adaptive"}))
+    return _S3
 
 def _rcmd(*args, input=None):
     return subprocess.run(["rclone", *args], text=True, input=input,
                           stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
 
+# One rclone 'rcd' daemon per process serves every list request over a
+# kept-alive localhost socket: process spawn + config load + S3 handshake
+# (~100-200ms per lsjson call) become a single socket write. Uses stdlib
+# http.client with one persistent connection; no extra dependency.
+_RC_PROC = None
+_RC_PORT = 0
+_RC_CONN = None
+_RC_DEAD = os.environ.get("AER_RCLONE_RCD", "1") == "0"
+_RC_LOCK = threading.Lock()
+
+def _rc_stop():
+    try:
+        if _RC_PROC is not None: _RC_PROC.terminate()
+    except Exception:
+        pass
+
+def _rc_start() -> bool:
+    global _RC_PROC, _RC_PORT, _RC_DEAD
+    with _RC_LOCK:
+        if _RC_DEAD:
+            return False
+        if _RC_PROC is not None:
+            return True
+        try:
+            s = socket.socket()
+            s.bind(("127.0.0.1", 0))
+            _RC_PORT = s.getsockname()[1]
+            s.close()
+            _RC_PROC = subprocess.Popen(
+                ["rclone", "rcd", "--rc-no-auth", f"--rc-addr=127.0.0.1:{_RC_PORT}"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            atexit.register(_rc_stop)
+        except Exception:
+            _RC_DEAD = True
+            return False
+    # Wait (briefly) until the daemon answers.
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        st, _ = _rc_call("rc/noop", {})
+        if st == 200:
+            return True
+        time.sleep(0.1)
+    with _RC_LOCK:
+        _RC_DEAD = True
+    return False
+
+def _rc_call(path: str, payload: dict):
+    """POST to the daemon over one persistent connection; returns
+    (status, parsed_json) or (0, None) when the daemon is unreachable."""
+    global _RC_CONN
+    body = json.dumps(payload).encode("utf-8")
+    hdrs = {"Content-Type": "application/json"}
+    with _RC_LOCK:
+        for attempt in (0, 1):
+            try:
+                if _RC_CONN is None:
+                    _RC_CONN = http.client.HTTPConnection("127.0.0.1", _RC_PORT, timeout=120)
+                _RC_CONN.request("POST", f"/{path}", body, hdrs)
+                resp = _RC_CONN.getresponse()
+                data = resp.read()
+                try:
+                    obj = json.loads(data or b"{}")
+                except Exception:
+                    obj = None
+                return resp.status, obj
+            except Exception:
+                try:
+                    if _RC_CONN is not None: _RC_CONN.close()
+                except Exception:
+                    pass
+                _RC_CONN = None   # stale keep-alive: reconnect once
+    return 0, None
+
 def s3_lsjson(remote_key: str):
     """Return lsjson array for a path; [] if empty; None on error."""
+    if _rc_start():
+        st, obj = _rc_call("operations/list", {"fs": REMOTE, "remote": remote_key})
+        if st == 200 and isinstance(obj, dict):
+            return obj.get("list", [])
+        if isinstance(obj, dict) and "directory not found" in str(obj.get("error", "")).lower():
+            return []
+        # real daemon error: fall through to a one-shot rclone below
     p = _rcmd("lsjson", f"{REMOTE}/{remote_key}")
     if p.returncode != 0:
-        # rclone returns non-zero if the path doesn't exist; treat as empty
-        return [] if "directory not found" in p.stdout.lower() else []
+        # Only a missing path is legitimately "empty". Anything else
+        # (auth, network) must surface: swallowing it makes s3_exists
+        # report False and triggers re-uploads of objects that exist.
+        if "directory not found" in p.stdout.lower():
+            return []
+        raise RuntimeError(f"rclone lsjson failed: {p.stdout[:500]}")
     try:
         return json.loads(p.stdout or "[]")
     except Exception:
         return []
 
+def _lsjson_retry(remote_key: str):
+    """s3_lsjson with a short backoff so a transient rclone hiccup does
+    not read as 'nothing uploaded yet'; empty only as a last resort."""
+    for wait in (1.0, 3.0):
+        try:
+            return s3_lsjson(remote_key)
+        except RuntimeError as e:
+            print(f"[s3] {e} — retrying in {wait:.0f}s")
+            time.sleep(wait)
+    try:
+        return s3_lsjson(remote_key)
+    except RuntimeError:
+        return []
+
+# A well produces dozens of sheet files under the same parent prefix;
+# cache one listing per prefix and answer every existence probe under it
+# from memory (O(prefixes) LIST calls instead of O(files)). A manual dict
+# rather than lru_cache so uploads can patch entries in place.
+_PREFIX_CACHE: dict = {}   # parent prefix ("a/b/") -> set of full keys
+_PREFIX_LOCK = threading.Lock()
+
+def _parent_prefix(remote_key: str) -> str:
+    return remote_key.rsplit("/", 1)[0] + "/" if "/" in remote_key else ""
+
+def _list_prefix(prefix: str) -> set:
+    with _PREFIX_LOCK:
+        hit = _PREFIX_CACHE.get(prefix)
+    if hit is not None:
+        return hit
+    keys: set = set()
+    c = s3_client()
+    if c is not None:
+        try:
+            for page in c.get_paginator("list_objects_v2").paginate(Bucket=BUCKET, Prefix=prefix):
+                keys.update(o["Key"] for o in page.get("Contents", []))
+        except Exception:
+            pass
+    else:
+        keys = {f"{prefix}{o.get('Path', '')}"
+                for o in _lsjson_retry(prefix.rstrip("/")) if not o.get("IsDir", False)}
+    with _PREFIX_LOCK:
+        _PREFIX_CACHE[prefix] = keys
+    return keys
+
+# Optional whole-tree snapshot: main() can scan the root prefix once
+# (one LIST per 1000 objects) and seed every worker with the key set, so
+# workers never LIST at all. Uploads patch the set; the conditional PUT
+# (chunk9-10) absorbs the rare mid-run race with another machine.
+_SEEDED = None   # set of every key under the root prefix, or None
+
+def preload_existing(prefix: str = "Data/") -> set:
+    """One paginated sweep of everything under prefix; {} on failure."""
+    keys: set = set()
+    c = s3_client()
+    if c is not None:
+        try:
+            for page in c.get_paginator("list_objects_v2").paginate(Bucket=BUCKET, Prefix=prefix):
+                keys.update(o["Key"] for o in page.get("Contents", []))
+        except Exception:
+            return set()
+        return keys
+    base = prefix.rstrip("/")
+    if _rc_start():
+        st, obj = _rc_call("operations/list", {"fs": REMOTE, "remote": base,
+                                               "opt": {"recurse": True, "filesOnly": True}})
+        if st == 200 and isinstance(obj, dict):
+            return {f"{base}/{o.get('Path', '')}" for o in obj.get("list", [])}
+    p = _rcmd("lsjson", "-R", "--files-only", "--fast-list", f"{REMOTE}/{base}")
+    if p.returncode == 0:
+        try:
+            keys = {f"{base}/{o.get('Path', '')}" for o in json.loads(p.stdout or "[]")}
+        except Exception:
+            pass
+    return keys
+
+def seed_existing(keys):
+    global _SEEDED
+    _SEEDED = set(keys)
+
 def s3_exists(remote_key: str) -> bool:
     """True if object exists at exact key (file)."""
-    arr = s3_lsjson(remote_key)
-    return any(not o.get("IsDir", False) and o.get("Path", "") == Path(remote_key).name for o in arr)
+    if _SEEDED is not None:
+        return remote_key in _SEEDED
+    return remote_key in _list_prefix(_parent_prefix(remote_key))
 
 def s3_any_under(prefix: str) -> bool:
     """True if there is at least one object under prefix/"""
-    arr = s3_lsjson(prefix)
+    arr = _lsjson_retry(prefix)
     return any(not o.get("IsDir", False) for o in arr)
 
 def s3_copyto_if_new(local_file: Path, remote_key: str) -> bool:
@@ -34,11 +228,128 @@ def s3_copyto_if_new(local_file: Path, remote_key: str) -> bool:
     Upload single file to S3 key if it doesn't already exist.
     Returns True if uploaded, False if skipped or failed.
     """
-    # Fast existence check
-    if s3_exists(remote_key):
-        return False
-    p = _rcmd("copyto", "--ignore-existing", str(local_file), f"{REMOTE}/{remote_key}")
-    return p.returncode == 0
+    c = s3_client()
+    if c is not None:
+        # If-None-Match folds the existence check into the PUT itself: one
+        # round trip instead of HEAD/LIST + PUT, and no window where two
+        # workers both see "missing" and both upload. Keys the cached
+        # listing already knows are skipped without any network.
+        if _SEEDED is not None and remote_key in _SEEDED:
+            return False
+        with _PREFIX_LOCK:
+            hit = _PREFIX_CACHE.get(_parent_prefix(remote_key))
+        if hit is not None and remote_key in hit:
+            return False
+        try:
+            size = Path(local_file).stat().st_size
+        except Exception:
+            size = 0
+        if _TC is not None and size >= _MULTIPART_MIN:
+            # upload_file streams parallel multipart parts. If-None-Match
+            # is not an allowed transfer arg, so big files keep an explicit
+            # existence probe before the transfer.
+            if s3_exists(remote_key):
+                return False
+            try:
+                c.upload_file(str(local_file), BUCKET, remote_key, Config=_TC)
+                print(f"[s3] multipart upload: {remote_key} ({size >> 20} MiB)")
+            except Exception:
+                return False
+            with _PREFIX_LOCK:
+                if hit is not None:
+                    hit.add(remote_key)
+                if _SEEDED is not None:
+                    _SEEDED.add(remote_key)
+            return True
+        try:
+            # Stream straight from the fd: botocore chunks the body onto
+            # the socket, so the file is never duplicated in memory.
+            with open(local_file, "rb") as fh:
+                c.put_object(Bucket=BUCKET, Key=remote_key, Body=fh, IfNoneMatch="*")
+        except Exception as e:
+            code = getattr(e, "response", {}).get("Error", {}).get("Code", "")
+            if code not in ("PreconditionFailed", "ConditionalRequestConflict"):
+                return False
+            # Lost the race: the object exists; remember that and skip.
+            with _PREFIX_LOCK:
+                if hit is not None:
+                    hit.add(remote_key)
+                if _SEEDED is not None:
+                    _SEEDED.add(remote_key)
+            return False
+    else:
+        # rclone path keeps the explicit pre-check.
+        if s3_exists(remote_key):
+            return False
+        p = _rcmd("copyto", "--ignore-existing", str(local_file), f"{REMOTE}/{remote_key}")
+        if p.returncode != 0:
+            return False
+    # Patch the cached listing so the next s3_exists sees the new object
+    # without another LIST.
+    with _PREFIX_LOCK:
+        hit = _PREFIX_CACHE.get(_parent_prefix(remote_key))
+        if hit is not None:
+            hit.add(remote_key)
+        if _SEEDED is not None:
+            _SEEDED.add(remote_key)
+    return True
+
+UPLOAD_WORKERS = int(os.environ.get("AER_UPLOAD_WORKERS", "32"))
+
+def _upload_many_rclone(pairs) -> int:
+    """No boto3: one rclone copy per destination prefix (startup, auth and
+    TLS paid once per batch, not once per file), with rclone's own
+    --transfers concurrency doing the fan-out."""
+    import tempfile
+    groups: dict = {}
+    leftovers = []
+    for local, key in pairs:
+        local = Path(local)
+        if Path(key).name != local.name:
+            leftovers.append((local, key))   # renamed on upload; copyto only
+            continue
+        groups.setdefault((str(local.parent), _parent_prefix(key)), []).append((local, key))
+    n = 0
+    for (local_dir, prefix), grp in groups.items():
+        known = _SEEDED if _SEEDED is not None else _list_prefix(prefix)
+        new = [(l, k) for l, k in grp if k not in known]
+        if not new:
+            continue
+        with tempfile.NamedTemporaryFile("w", suffix=".list", delete=False) as tf:
+            tf.write("\n".join(l.name for l, _ in new))
+            listfile = tf.name
+        try:
+            p = _rcmd("copy", "--transfers=64", "--checkers=32",
+                      "--s3-no-check-bucket", "--ignore-existing",
+                      "--files-from", listfile,
+                      local_dir, f"{REMOTE}/{prefix.rstrip('/')}")
+        finally:
+            try: os.unlink(listfile)
+            except Exception: pass
+        if p.returncode == 0:
+            with _PREFIX_LOCK:
+                hit = _PREFIX_CACHE.get(prefix)
+                if hit is not None:
+                    hit.update(k for _, k in new)
+                if _SEEDED is not None:
+                    _SEEDED.update(k for _, k in new)
+            n += len(new)
+    return n + sum(1 for l, k in leftovers if s3_copyto_if_new(l, k))
+
+def s3_upload_many(pairs) -> int:
+    """Upload (local_file, remote_key) pairs concurrently; returns how many
+    were actually uploaded. The work is I/O-bound socket time, so threads
+    overlap the per-object round trips instead of paying them serially;
+    the shared boto3 client is thread-safe."""
+    pairs = list(pairs)
+    if not pairs:
+        return 0
+    if s3_client() is None:
+        return _upload_many_rclone(pairs)
+    if len(pairs) == 1:
+        return 1 if s3_copyto_if_new(*pairs[0]) else 0
+    with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(pairs))) as ex:
+        return sum(1 for ok in ex.map(lambda p: s3_copyto_if_new(*p), pairs) if ok)
 
 def s3_delete(remote_key: str):
     _rcmd("deletefile", f"{REMOTE}/{remote_key}")